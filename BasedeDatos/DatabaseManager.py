@@ -8,8 +8,14 @@ DESCRIPCIÓN: Administra la base de datos SQLite, manejando el ciclo de vida de
 import sqlite3
 import os
 import csv
-from datetime import datetime
-from typing import Optional, Dict, List, Tuple, Any
+import json
+import threading
+from functools import lru_cache
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from operator import itemgetter
+from typing import Optional, Dict, List, Tuple, Any, Iterator
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,10 +39,179 @@ MEASUREMENT_COLUMNS = (
 
 MEASUREMENT_COLUMNS_STR = ', '.join(MEASUREMENT_COLUMNS)
 
+# Accesores posicionales (en C) para filas con el orden de MEASUREMENT_COLUMNS.
+# En sqlite3.Row el acceso por nombre recorre las columnas; por índice es directo.
+_GETTERS = {col: itemgetter(i) for i, col in enumerate(MEASUREMENT_COLUMNS)}
+
+# PRAGMAs aplicados una sola vez sobre la conexión persistente:
+# WAL permite lecturas concurrentes con la escritura y el resto reduce
+# sincronizaciones a disco y mantiene las páginas calientes en memoria.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA foreign_keys=ON",
+)
+
+# Tamaño de la caché de sentencias preparadas de la conexión. sqlite3 indexa
+# la caché por el texto exacto del SQL, por eso las consultas repetidas se
+# mantienen como constantes de clase.
+STATEMENT_CACHE_SIZE = 256
+
+
+def _day_range(day: date) -> Tuple[str, str]:
+    """Límites [inicio, fin) de un día como texto ISO, comparables contra `timestamp`
+    para que SQLite resuelva el filtro con un rango sobre el índice."""
+    return day.isoformat(), (day + timedelta(days=1)).isoformat()
+
+
+# Marca temporal generada por SQLite cuando la medición no trae una propia.
+TIMESTAMP_DEFAULT_SQL = "(strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))"
+
+
+# Columnas que recibe el INSERT, sin `id` (AUTOINCREMENT) ni `timestamp`
+# (se antepone o se delega al DEFAULT de SQLite según la variante usada).
+_INSERT_COLS = MEASUREMENT_COLUMNS[2:]
+
+# Valor usado cuando la medición no informa una columna; el resto vale 0.
+_INSERT_DEFAULTS: Dict[str, Any] = dict.fromkeys(_INSERT_COLS, 0)
+_INSERT_DEFAULTS.update({
+    'fish_id': '',
+    'manual_length_cm': None,
+    'manual_height_cm': None,
+    'manual_width_cm': None,
+    'manual_weight_g': None,
+    'notes': '',
+    'image_path': '',
+    'measurement_type': 'auto',
+    'validation_errors': '',
+    'batch_id': '',
+})
+_INSERT_KEYS = tuple(_INSERT_DEFAULTS.items())
+
+
+# INSERT ... RETURNING está disponible desde SQLite 3.35.
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def _build_insert_sql(columns: Tuple[str, ...], returning: bool = False) -> str:
+    """Genera el INSERT de mediciones para las columnas indicadas."""
+    placeholders = ', '.join('?' * len(columns))
+    sql = f"INSERT INTO measurements ({', '.join(columns)}) VALUES ({placeholders})"
+    return f"{sql} RETURNING id" if returning else sql
+
+
+def _row_to_tuple(data: Dict[str, Any]) -> Tuple:
+    """Convierte un diccionario de medición en la tupla de parámetros del INSERT
+    (sin la marca temporal, que se antepone según la variante usada)."""
+    if 'lat_area_cm2' not in data and 'area_cm2' in data:
+        data = {**data, 'lat_area_cm2': data['area_cm2']}
+    return tuple([data.get(col, default) for col, default in _INSERT_KEYS])
+
+
+# Fragmentos WHERE del historial; el bit i de la máscara activa el fragmento i.
+# Las tandas excluidas viajan como un único arreglo JSON para que el texto SQL
+# no dependa de cuántas sean.
+_FILTER_FRAGMENTS = (
+    " AND measurement_type = ?",
+    " AND COALESCE(batch_id, '') = ?",
+    " AND COALESCE(batch_id, '') NOT IN (SELECT value FROM json_each(?))",
+    " AND timestamp >= ?",
+    " AND timestamp < ?",
+)
+_FILTER_TYPE, _FILTER_BATCH, _FILTER_EXCLUDED, _FILTER_START, _FILTER_END = (
+    1 << bit for bit in range(len(_FILTER_FRAGMENTS))
+)
+
+# Variantes de búsqueda de texto, codificadas en los bits altos de la máscara.
+# El índice FTS5 (tokenizador trigram) resuelve subcadenas de 3+ caracteres;
+# las búsquedas más cortas o sin FTS5 disponible conservan el LIKE original.
+_SEARCH_FRAGMENTS = (
+    "",
+    " AND (fish_id LIKE ? OR notes LIKE ? OR CAST(id AS TEXT) LIKE ?)",
+    " AND id IN (SELECT rowid FROM measurements_fts WHERE measurements_fts MATCH ?)",
+    " AND (id IN (SELECT rowid FROM measurements_fts WHERE measurements_fts MATCH ?)"
+    " OR CAST(id AS TEXT) LIKE ?)",
+)
+_SEARCH_NONE, _SEARCH_LIKE, _SEARCH_FTS, _SEARCH_FTS_OR_ID = range(len(_SEARCH_FRAGMENTS))
+_SEARCH_SHIFT = len(_FILTER_FRAGMENTS)
+
+_FILTER_WHERE = tuple(
+    "1=1" + "".join(
+        fragment for bit, fragment in enumerate(_FILTER_FRAGMENTS) if mask & (1 << bit)
+    ) + _SEARCH_FRAGMENTS[mask >> _SEARCH_SHIFT]
+    for mask in range(len(_SEARCH_FRAGMENTS) << _SEARCH_SHIFT)
+)
+
+# SQL completo precompilado por forma de filtro: el texto es siempre idéntico
+# para la misma combinación y reutiliza la sentencia preparada de la conexión.
+_FILTER_SELECT_SQL = tuple(
+    f"SELECT {MEASUREMENT_COLUMNS_STR} FROM measurements WHERE {where} ORDER BY timestamp DESC"
+    for where in _FILTER_WHERE
+)
+_FILTER_SELECT_PAGED_SQL = tuple(f"{sql} LIMIT ? OFFSET ?" for sql in _FILTER_SELECT_SQL)
+_FILTER_COUNT_SQL = tuple(
+    f"SELECT COUNT(*) FROM measurements WHERE {where}" for where in _FILTER_WHERE
+)
+_FILTER_TOTALS_SQL = tuple(
+    f'''
+    SELECT
+        COUNT(*) AS total,
+        AVG(CASE WHEN length_cm > 0 THEN length_cm END) AS avg_length,
+        AVG(CASE WHEN weight_g > 0 THEN weight_g END) AS avg_weight,
+        SUM(CASE WHEN measurement_type LIKE 'manual%' THEN 1 ELSE 0 END) AS manual_total,
+        SUM(CASE WHEN measurement_type NOT LIKE 'manual%' THEN 1 ELSE 0 END) AS auto_total
+    FROM measurements
+    WHERE {where}
+    '''
+    for where in _FILTER_WHERE
+)
+
+
+# Columnas que update_measurement puede modificar: las mismas que la edición
+# siempre ha escrito. `image_path` y `confidence_score` los fija la captura y
+# no se sobrescriben al editar (p. ej. con "" si la imagen no se localiza).
+_UPDATABLE_COLS = tuple(
+    col for col in MEASUREMENT_COLUMNS
+    if col not in ('id', 'confidence_score', 'image_path')
+)
+
+
+@lru_cache(maxsize=64)
+def _build_update_sql(columns: Tuple[str, ...]) -> str:
+    """Genera (y memoriza por combinación de columnas) el UPDATE parcial de una medición."""
+    assignments = ', '.join(f"{col} = ?" for col in columns)
+    return f"UPDATE measurements SET {assignments} WHERE id = ?"
+
+
+# Fila de la tabla `calibrations` tal como la consume la aplicación.
+Calibration = namedtuple('Calibration', (
+    'scale_lat_front', 'scale_lat_back', 'scale_top_front', 'scale_top_back',
+    'hsv_left_h_min', 'hsv_left_h_max', 'hsv_left_s_min', 'hsv_left_s_max', 'hsv_left_v_min', 'hsv_left_v_max',
+    'hsv_top_h_min', 'hsv_top_h_max', 'hsv_top_s_min', 'hsv_top_s_max', 'hsv_top_v_min', 'hsv_top_v_max',
+    'timestamp',
+))
+
+_LATEST_CALIBRATION_SQL = (
+    f"SELECT {', '.join(Calibration._fields)} FROM calibrations ORDER BY timestamp DESC LIMIT 1"
+)
+
+
+def _calibration_factory(cursor: sqlite3.Cursor, row: Tuple) -> Calibration:
+    return Calibration._make(row)
+
+
 class DatabaseManager:
     """
     Controlador central para operaciones CRUD y administración de SQLite.
     """
+
+    _INSERT_SQL_WITH_TS = _build_insert_sql(('timestamp',) + _INSERT_COLS, returning=_SUPPORTS_RETURNING)
+    _INSERT_SQL_NO_TS = _build_insert_sql(_INSERT_COLS, returning=_SUPPORTS_RETURNING)
+    # executemany descarta las filas de RETURNING: el bloque usa el INSERT simple.
+    _INSERT_SQL_BULK = _build_insert_sql(('timestamp',) + _INSERT_COLS)
     
     def __init__(self, db_path: Optional[str] = None):
         """
@@ -48,8 +223,53 @@ class DatabaseManager:
             db_path = os.path.join(folder, "database.db")
         
         self.db_path = db_path
-        self._column_cache: Optional[Dict[str, int]] = None
+        self._timestamp_has_default = False
+        self._fts_enabled = False
+        # Conteo en memoria de mediciones del día para get_next_fish_number.
+        self._today_date: Optional[str] = None
+        self._today_count = 0
+        self._lock = threading.RLock()
+        self._conn = self._connect()
         self.init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre la conexión persistente compartida por todas las operaciones."""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        # Filas indexables por nombre y por posición resueltas en C.
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"No se pudo aplicar '{pragma}': {e}")
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Ejecuta un bloque de escritura en una transacción explícita y serializada."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn.cursor()
+                # Dentro del try: un COMMIT fallido (p. ej. SQLITE_BUSY) también
+                # revierte, o la conexión persistente quedaría en la transacción.
+                self._conn.execute("COMMIT")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        """Cierra la conexión persistente."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
     
     # ========================================================================
     # INICIALIZACIÓN Y MIGRACIONES
@@ -57,14 +277,14 @@ class DatabaseManager:
     def init_database(self) -> None:
         """Crea la estructura relacional (tablas e índices) si no existe en el sistema.
         Define tablas para: Mediciones, Calibraciones y Perfiles de Especies."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
         
         # Tabla de mediciones biométricas y ambientales
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS measurements (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
+                timestamp TEXT NOT NULL DEFAULT ''' + TIMESTAMP_DEFAULT_SQL + ''',
                 fish_id TEXT,
                 
                 length_cm REAL,
@@ -141,8 +361,9 @@ class DatabaseManager:
         
         # Crear índices
         self._create_indexes(cursor, conn)
+        self._create_search_index(cursor)
+        self._create_daily_counts()
         
-        conn.close()
         logger.info("Base de datos inicializada correctamente.")
     
     def migrate_database(self, cursor: sqlite3.Cursor, conn: sqlite3.Connection) -> None:
@@ -174,7 +395,14 @@ class DatabaseManager:
         }
         
         cursor.execute("PRAGMA table_info(measurements)")
-        existing_cols_meas = {col[1] for col in cursor.fetchall()}
+        table_info = cursor.fetchall()
+        existing_cols_meas = {col[1] for col in table_info}
+
+        # SQLite no permite cambiar el DEFAULT de una columna existente: en bases
+        # antiguas la marca temporal se sigue generando desde Python.
+        self._timestamp_has_default = any(
+            col[1] == 'timestamp' and col[4] is not None for col in table_info
+        )
         
         for col_name, col_type in new_columns_meas.items():
             if col_name not in existing_cols_meas:
@@ -197,7 +425,6 @@ class DatabaseManager:
             logger.error(f"Error aplicando backfill de tanda historica: {e}")
 
         conn.commit()
-        self._column_cache = None
 
     def _create_indexes(self, cursor: sqlite3.Cursor, conn: sqlite3.Connection) -> None:
         """Optimiza la velocidad de respuesta para consultas de filtrado y ordenamiento."""
@@ -205,83 +432,182 @@ class DatabaseManager:
             "CREATE INDEX IF NOT EXISTS idx_timestamp ON measurements(timestamp DESC)",
             "CREATE INDEX IF NOT EXISTS idx_fish_id ON measurements(fish_id)",
             "CREATE INDEX IF NOT EXISTS idx_measurement_type ON measurements(measurement_type)",
-            "CREATE INDEX IF NOT EXISTS idx_batch_id ON measurements(batch_id)"
+            "CREATE INDEX IF NOT EXISTS idx_batch_id ON measurements(batch_id)",
+            "CREATE INDEX IF NOT EXISTS idx_date ON measurements(date(timestamp))",
+            "CREATE INDEX IF NOT EXISTS idx_type_ts ON measurements(measurement_type, timestamp DESC)",
+            # Día como texto (substr): lo usan los agregados diarios de ApiService
+            "CREATE INDEX IF NOT EXISTS idx_day ON measurements(substr(timestamp, 1, 10))",
+            # Solo filas con longitud válida: rango de fechas de /api/last_report y /api/stats
+            "CREATE INDEX IF NOT EXISTS idx_valid_ts ON measurements(timestamp DESC) "
+            "WHERE length_cm > 0 OR manual_length_cm > 0",
         ]
         for idx_query in indexes:
             try:
                 cursor.execute(idx_query)
             except sqlite3.OperationalError:
                 pass
+        # Estadísticas para que el planificador elija los índices de expresión
+        try:
+            cursor.execute("PRAGMA optimize")
+        except sqlite3.OperationalError:
+            pass
         conn.commit()
     
+    def _create_search_index(self, cursor: sqlite3.Cursor) -> None:
+        """Mantiene un índice FTS5 sobre `fish_id` y `notes` para la búsqueda del historial.
+        Si el SQLite instalado no trae FTS5/trigram se sigue usando LIKE."""
+        try:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'measurements_fts'"
+            )
+            exists = cursor.fetchone() is not None
+            
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS measurements_fts USING fts5(
+                    fish_id, notes,
+                    content='measurements', content_rowid='id',
+                    tokenize='trigram'
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS measurements_fts_ai AFTER INSERT ON measurements BEGIN
+                    INSERT INTO measurements_fts(rowid, fish_id, notes)
+                    VALUES (new.id, new.fish_id, new.notes);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS measurements_fts_ad AFTER DELETE ON measurements BEGIN
+                    INSERT INTO measurements_fts(measurements_fts, rowid, fish_id, notes)
+                    VALUES ('delete', old.id, old.fish_id, old.notes);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS measurements_fts_au AFTER UPDATE OF fish_id, notes ON measurements BEGIN
+                    INSERT INTO measurements_fts(measurements_fts, rowid, fish_id, notes)
+                    VALUES ('delete', old.id, old.fish_id, old.notes);
+                    INSERT INTO measurements_fts(rowid, fish_id, notes)
+                    VALUES (new.id, new.fish_id, new.notes);
+                END
+            ''')
+            
+            if not exists:
+                # Indexa los registros previos a la creación del índice.
+                cursor.execute("INSERT INTO measurements_fts(measurements_fts) VALUES ('rebuild')")
+                logger.info("Indice de busqueda FTS5 creado.")
+            
+            self._fts_enabled = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Busqueda FTS5 no disponible, se usara LIKE: {e}")
+            self._fts_enabled = False
+    
+    def _create_daily_counts(self) -> None:
+        """Mantiene por trigger el total de mediciones por día (`daily_counts`),
+        de modo que el conteo diario es una lectura de una sola fila.
+
+        Tabla, triggers y carga inicial van en una sola transacción: si algo
+        falla no queda una tabla vacía que los arranques siguientes den por buena."""
+        with self._transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS daily_counts (
+                    day TEXT PRIMARY KEY,
+                    n INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            # El día es el prefijo YYYY-MM-DD de `timestamp`, igual que en _day_range.
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS daily_counts_ai AFTER INSERT ON measurements BEGIN
+                    INSERT INTO daily_counts(day, n) VALUES (substr(new.timestamp, 1, 10), 1)
+                    ON CONFLICT(day) DO UPDATE SET n = n + 1;
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS daily_counts_ad AFTER DELETE ON measurements BEGIN
+                    UPDATE daily_counts SET n = n - 1 WHERE day = substr(old.timestamp, 1, 10);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS daily_counts_au AFTER UPDATE OF timestamp ON measurements
+                WHEN substr(old.timestamp, 1, 10) IS NOT substr(new.timestamp, 1, 10) BEGIN
+                    UPDATE daily_counts SET n = n - 1 WHERE day = substr(old.timestamp, 1, 10);
+                    INSERT INTO daily_counts(day, n) VALUES (substr(new.timestamp, 1, 10), 1)
+                    ON CONFLICT(day) DO UPDATE SET n = n + 1;
+                END
+            ''')
+            
+            # Una tabla vacía nunca ha sido cargada (los triggers solo la hacen crecer),
+            # así que también se recuperan bases que quedaron a medio inicializar.
+            cursor.execute("SELECT 1 FROM daily_counts LIMIT 1")
+            if cursor.fetchone() is None:
+                cursor.execute('''
+                    INSERT INTO daily_counts(day, n)
+                    SELECT substr(timestamp, 1, 10), COUNT(*) FROM measurements
+                    GROUP BY substr(timestamp, 1, 10)
+                ''')
+    
     # ========================================================================
     # OPERACIONES DE PERSISTENCIA (CRUD)
     # ========================================================================
     def save_measurement(self, data: Dict[str, Any]) -> int:
         """Registra una nueva medición biométrica."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        params = _row_to_tuple(data)
+        timestamp = data.get('timestamp')
         
-        lat_area = data.get('lat_area_cm2', data.get('area_cm2', 0))
-        top_area = data.get('top_area_cm2', 0)
+        # El conteo del día se actualiza tras el COMMIT, sin soltar el lock.
+        with self._lock:
+            with self._transaction() as cursor:
+                if timestamp is None and self._timestamp_has_default:
+                    cursor.execute(self._INSERT_SQL_NO_TS, params)
+                else:
+                    cursor.execute(
+                        self._INSERT_SQL_WITH_TS,
+                        (timestamp or datetime.now().isoformat(),) + params,
+                    )
+                measurement_id = cursor.fetchone()[0] if _SUPPORTS_RETURNING else cursor.lastrowid
+            self._count_inserted_today([timestamp])
         
-        cursor.execute('''
-            INSERT INTO measurements 
-            (timestamp, fish_id, length_cm, height_cm, width_cm, weight_g,
-             manual_length_cm, manual_height_cm, manual_width_cm, manual_weight_g,
-             lat_area_cm2, top_area_cm2, volume_cm3, 
-             confidence_score, notes, image_path, measurement_type, validation_errors,
-             api_air_temp_c, api_water_temp_c, api_rel_humidity, 
-             api_abs_humidity_g_m3, api_ph, api_cond_us_cm, api_do_mg_l, api_turbidity_ntu, batch_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data.get('timestamp', datetime.now().isoformat()),
-            data.get('fish_id', ''), 
-            data.get('length_cm', 0),
-            data.get('height_cm', 0),
-            data.get('width_cm', 0),
-            data.get('weight_g', 0),
-            
-            data.get('manual_length_cm'),
-            data.get('manual_height_cm'),
-            data.get('manual_width_cm'),
-            data.get('manual_weight_g'),
-            
-            lat_area,
-            top_area,
-            data.get('volume_cm3', 0),
-            
-            data.get('confidence_score', 0), 
-            data.get('notes', ''), 
-            data.get('image_path', ''),
-            data.get('measurement_type', 'auto'),
-            data.get('validation_errors', ''),
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Medicion guardada: ID=%s", measurement_id)
             
-            data.get('api_air_temp_c', 0),
-            data.get('api_water_temp_c', 0),
-            data.get('api_rel_humidity', 0),
-            data.get('api_abs_humidity_g_m3', 0),
-            data.get('api_ph', 0),
-            data.get('api_cond_us_cm', 0),
-            data.get('api_do_mg_l', 0),
-            data.get('api_turbidity_ntu', 0),
-            data.get('batch_id', '')
-        ))
+        return measurement_id
+
+    def save_measurements_bulk(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """Registra varias mediciones en una única transacción."""
+        now = datetime.now().isoformat()
+        params = [(data.get('timestamp') or now,) + _row_to_tuple(data) for data in rows]
+        if not params:
+            return []
         
-        conn.commit()
-        measurement_id = cursor.lastrowid
-        conn.close()
+        with self._lock:
+            with self._transaction() as cursor:
+                cursor.executemany(self._INSERT_SQL_BULK, params)
+                last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            self._count_inserted_today([p[0] for p in params])
         
-        logger.info("Medicion guardada: ID=%s", measurement_id)
-            
-        return measurement_id
+        # Con AUTOINCREMENT y la escritura serializada los IDs son consecutivos.
+        first_id = last_id - len(params) + 1
+        measurement_ids = list(range(first_id, last_id + 1))
+        # Un único registro por bloque, no uno por fila.
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Mediciones guardadas en bloque: %s (IDs %s-%s)",
+                len(measurement_ids), first_id, last_id,
+            )
+        return measurement_ids
+    
+    def _count_inserted_today(self, timestamps: List[Optional[str]]) -> None:
+        """Actualiza el conteo del día en memoria tras un insert ya confirmado
+        (None = hora actual). Se llama con `_lock` tomado."""
+        if self._today_date is None:
+            return
+        self._today_count += sum(
+            1 for ts in timestamps if ts is None or ts[:10] == self._today_date
+        )
     
     def get_measurement_as_dict(self, m_id):
         """Retorna un registro completo mapeado como diccionario"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row 
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 cursor.execute("SELECT * FROM measurements WHERE id = ?", (m_id,))
                 row = cursor.fetchone()
                 return dict(row) if row else None
@@ -289,100 +615,55 @@ class DatabaseManager:
             logger.error(f"Error al obtener diccionario de medicion: {e}")
             return None
     
-    def get_measurement_by_id(self, measurement_id: int) -> Optional[Tuple]:
+    def get_measurement_by_id(self, measurement_id: int) -> Optional[sqlite3.Row]:
         """Recupera UNA medición por su ID."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            f"SELECT {MEASUREMENT_COLUMNS_STR} FROM measurements WHERE id = ?", 
-            (measurement_id,)
-        )
-        result = cursor.fetchone()
-        conn.close()
-        return result
+        with self._lock:
+            cursor = self._conn.execute(
+                f"SELECT {MEASUREMENT_COLUMNS_STR} FROM measurements WHERE id = ?", 
+                (measurement_id,)
+            )
+            return cursor.fetchone()
     
     def update_measurement(self, measurement_id: int, data: Dict[str, Any]) -> bool:
-        """Actualiza una medición existente."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Actualiza una medición existente. Solo se escriben las columnas presentes
+        en `data`; el resto del registro se conserva."""
+        if 'lat_area_cm2' not in data and 'area_cm2' in data:
+            data = {**data, 'lat_area_cm2': data['area_cm2']}
         
-        lat_area = data.get('lat_area_cm2', data.get('area_cm2', 0))
+        columns = tuple(col for col in _UPDATABLE_COLS if col in data)
+        if not columns:
+            return False
         
-        cursor.execute('''
-            UPDATE measurements 
-            SET timestamp = ?, fish_id = ?, 
-                length_cm = ?, height_cm = ?, width_cm = ?, weight_g = ?,
-                manual_length_cm = ?, manual_height_cm = ?, manual_width_cm = ?, manual_weight_g = ?,
-                lat_area_cm2 = ?, top_area_cm2 = ?, volume_cm3 = ?,
-                notes = ?, measurement_type = ?, validation_errors = ?,
-                api_air_temp_c = ?, api_water_temp_c = ?, api_rel_humidity = ?,
-                api_abs_humidity_g_m3 = ?, api_ph = ?, api_cond_us_cm = ?, api_do_mg_l = ?, api_turbidity_ntu = ?,
-                batch_id = ?
-            WHERE id = ?
-        ''', (
-            data.get('timestamp', ''),
-            data.get('fish_id', ''),
-            data.get('length_cm', 0),
-            data.get('height_cm', 0),
-            data.get('width_cm', 0),
-            data.get('weight_g', 0),
-            
-            data.get('manual_length_cm'),
-            data.get('manual_height_cm'),
-            data.get('manual_width_cm'),
-            data.get('manual_weight_g'),
-            
-            lat_area,
-            data.get('top_area_cm2', 0),
-            data.get('volume_cm3', 0),
-            
-            data.get('notes', ''),
-            data.get('measurement_type', 'manual'),
-            data.get('validation_errors', ''),
-            
-            data.get('api_air_temp_c', 0),
-            data.get('api_water_temp_c', 0),
-            data.get('api_rel_humidity', 0),
-            data.get('api_abs_humidity_g_m3', 0),
-            data.get('api_ph', 0),
-            data.get('api_cond_us_cm', 0),
-            data.get('api_do_mg_l', 0),
-            data.get('api_turbidity_ntu', 0),
-            data.get('batch_id', ''),
-            
-            measurement_id
-        ))
+        params = [data[col] for col in columns]
+        params.append(measurement_id)
         
-        conn.commit()
-        affected_rows = cursor.rowcount
-        conn.close()
+        with self._transaction() as cursor:
+            cursor.execute(_build_update_sql(columns), params)
+            affected_rows = cursor.rowcount
+        self.invalidate_cache()
         return affected_rows > 0
     
     def delete_measurement(self, measurement_id: int) -> bool:
         """Elimina una medición por ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM measurements WHERE id = ?", (measurement_id,))
-        conn.commit()
-        affected_rows = cursor.rowcount
-        conn.close()
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM measurements WHERE id = ?", (measurement_id,))
+            affected_rows = cursor.rowcount
+        self.invalidate_cache()
         return affected_rows > 0
     
     def execute_query(self, query: str, parameters: tuple = (), fetchone: bool = False, fetchall: bool = False) -> Any:
         """Ejecuta una consulta SQL"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            if fetchone or fetchall:
+                # Las lecturas no abren transacción ni fuerzan commit.
+                with self._lock:
+                    cursor = self._conn.execute(query, parameters)
+                    return cursor.fetchone() if fetchone else cursor.fetchall()
+            
+            with self._transaction() as cursor:
                 cursor.execute(query, parameters)
-                
-                if fetchone:
-                    return cursor.fetchone()
-                if fetchall:
-                    return cursor.fetchall()
-                
-                conn.commit()
-                return True
+            self.invalidate_cache()
+            return True
         except Exception as e:
             logger.error(f"Error ejecutando query '{query}': {e}")
             return None if (fetchone or fetchall) else False
@@ -405,37 +686,67 @@ class DatabaseManager:
         excluded_batch_ids: Optional[List[str]] = None,
         date_start: Optional[str] = None, 
         date_end: Optional[str] = None
-    ) -> List[Tuple]:
+    ) -> List[sqlite3.Row]:
         """Consulta optimizada con índices y filtros."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            where_clause, params = self._build_measurements_filters(
+            return list(self.iter_filtered_measurements(
+                limit=limit,
+                offset=offset,
                 search_query=search_query,
                 filter_type=filter_type,
                 batch_id=batch_id,
                 excluded_batch_ids=excluded_batch_ids,
                 date_start=date_start,
                 date_end=date_end,
-            )
-            query = f"SELECT {MEASUREMENT_COLUMNS_STR} FROM measurements WHERE {where_clause}"
-            
-            query += " ORDER BY timestamp DESC"
-            
-            if limit is not None:
-                query += " LIMIT ? OFFSET ?"
-                params.extend([limit, offset])
-            
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            conn.close()
-            return results
+            ))
         
         except Exception as e:
             logger.error("Error en get_filtered_measurements", exc_info=True)
             return []
 
+    def iter_filtered_measurements(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        search_query: Optional[str] = None,
+        filter_type: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        excluded_batch_ids: Optional[List[str]] = None,
+        date_start: Optional[str] = None,
+        date_end: Optional[str] = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[sqlite3.Row]:
+        """Igual que get_filtered_measurements pero entrega las filas por bloques
+        de `chunk_size`, sin materializar todo el resultado en memoria."""
+        mask, params = self._build_measurements_filters(
+            search_query=search_query,
+            filter_type=filter_type,
+            batch_id=batch_id,
+            excluded_batch_ids=excluded_batch_ids,
+            date_start=date_start,
+            date_end=date_end,
+        )
+        
+        if limit is None:
+            query = _FILTER_SELECT_SQL[mask]
+        else:
+            query = _FILTER_SELECT_PAGED_SQL[mask]
+            params.extend([limit, offset])
+        
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        try:
+            while True:
+                # El lock solo se toma por bloque para no bloquear a otros hilos
+                # mientras el consumidor procesa las filas.
+                with self._lock:
+                    rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
     def get_filtered_measurements_count(
         self,
         search_query: Optional[str] = None,
@@ -447,10 +758,7 @@ class DatabaseManager:
     ) -> int:
         """Retorna el total de registros para los filtros aplicados."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            where_clause, params = self._build_measurements_filters(
+            mask, params = self._build_measurements_filters(
                 search_query=search_query,
                 filter_type=filter_type,
                 batch_id=batch_id,
@@ -459,12 +767,8 @@ class DatabaseManager:
                 date_end=date_end,
             )
 
-            cursor.execute(
-                f"SELECT COUNT(*) FROM measurements WHERE {where_clause}",
-                params,
-            )
-            result = cursor.fetchone()
-            conn.close()
+            with self._lock:
+                result = self._conn.execute(_FILTER_COUNT_SQL[mask], params).fetchone()
             return int(result[0]) if result else 0
         except Exception:
             logger.error("Error en get_filtered_measurements_count", exc_info=True)
@@ -481,10 +785,7 @@ class DatabaseManager:
     ) -> Dict[str, Any]:
         """Retorna totales rápidos para la vista de historial."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            where_clause, params = self._build_measurements_filters(
+            mask, params = self._build_measurements_filters(
                 search_query=search_query,
                 filter_type=filter_type,
                 batch_id=batch_id,
@@ -493,22 +794,8 @@ class DatabaseManager:
                 date_end=date_end,
             )
 
-            cursor.execute(
-                f'''
-                SELECT
-                    COUNT(*) AS total,
-                    AVG(CASE WHEN length_cm > 0 THEN length_cm END) AS avg_length,
-                    AVG(CASE WHEN weight_g > 0 THEN weight_g END) AS avg_weight,
-                    SUM(CASE WHEN measurement_type LIKE 'manual%' THEN 1 ELSE 0 END) AS manual_total,
-                    SUM(CASE WHEN measurement_type NOT LIKE 'manual%' THEN 1 ELSE 0 END) AS auto_total
-                FROM measurements
-                WHERE {where_clause}
-                ''',
-                params,
-            )
-
-            row = cursor.fetchone()
-            conn.close()
+            with self._lock:
+                row = self._conn.execute(_FILTER_TOTALS_SQL[mask], params).fetchone()
 
             if not row:
                 return {
@@ -544,51 +831,60 @@ class DatabaseManager:
         excluded_batch_ids: Optional[List[str]] = None,
         date_start: Optional[str] = None,
         date_end: Optional[str] = None,
-    ) -> Tuple[str, List[Any]]:
-        """Construye la cláusula WHERE y sus parámetros."""
-        query = "1=1"
+    ) -> Tuple[int, List[Any]]:
+        """Calcula la forma del filtro (máscara de bits sobre `_FILTER_FRAGMENTS`
+        más la variante de búsqueda) y sus parámetros en el mismo orden."""
+        mask = 0
         params: List[Any] = []
 
         if filter_type and filter_type not in ["Todas", "Todos", None]:
-            query += " AND measurement_type = ?"
+            mask |= _FILTER_TYPE
             params.append(filter_type)
 
         if batch_id and batch_id not in ["Todas", "Todos", None, ""]:
-            query += " AND COALESCE(batch_id, '') = ?"
+            mask |= _FILTER_BATCH
             params.append(batch_id)
 
         if excluded_batch_ids:
             cleaned = [b for b in excluded_batch_ids if b and b not in ["Todas", "Todos"]]
             if cleaned:
-                placeholders = ", ".join(["?" for _ in cleaned])
-                query += f" AND COALESCE(batch_id, '') NOT IN ({placeholders})"
-                params.extend(cleaned)
+                mask |= _FILTER_EXCLUDED
+                params.append(json.dumps(cleaned))
 
+        # Comparación directa contra `timestamp` para aprovechar idx_timestamp/idx_type_ts.
         if date_start:
-            query += " AND date(timestamp) >= date(?)"
-            params.append(date_start)
+            mask |= _FILTER_START
+            params.append(_day_range(date.fromisoformat(date_start[:10]))[0])
 
         if date_end:
-            query += " AND date(timestamp) <= date(?)"
-            params.append(date_end)
+            mask |= _FILTER_END
+            params.append(_day_range(date.fromisoformat(date_end[:10]))[1])
 
         if search_query:
-            query += " AND (fish_id LIKE ? OR notes LIKE ? OR CAST(id AS TEXT) LIKE ?)"
             wildcard = f"%{search_query}%"
-            params.extend([wildcard, wildcard, wildcard])
+            if self._fts_enabled and len(search_query) >= 3:
+                # Frase entre comillas: el trigram la trata como subcadena literal.
+                params.append('"' + search_query.replace('"', '""') + '"')
+                # Un ID solo puede coincidir si la búsqueda es numérica.
+                if search_query.isdigit():
+                    mask |= _SEARCH_FTS_OR_ID << _SEARCH_SHIFT
+                    params.append(wildcard)
+                else:
+                    mask |= _SEARCH_FTS << _SEARCH_SHIFT
+            else:
+                mask |= _SEARCH_LIKE << _SEARCH_SHIFT
+                params.extend([wildcard, wildcard, wildcard])
 
-        return query, params
+        return mask, params
     
     def get_today_measurements_count(self) -> int:
         """Cuenta mediciones del día actual."""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM measurements WHERE date(timestamp) = ?", (today,))
-            count = cursor.fetchone()[0]
-            conn.close()
-            return count
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT n FROM daily_counts WHERE day = ?", (date.today().isoformat(),)
+                ).fetchone()
+            return row[0] if row else 0
         except Exception:
             return 0
         
@@ -596,57 +892,44 @@ class DatabaseManager:
                          scale_top_front: float, scale_top_back: float, 
                          hsv_left: Optional[Dict] = None, hsv_top: Optional[Dict] = None, 
                          notes: str = "") -> int:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         default_hsv = {'h_min': 35, 'h_max': 85, 's_min': 40, 's_max': 255, 'v_min': 40, 'v_max': 255}
         hsv_l = hsv_left if hsv_left else default_hsv
         hsv_t = hsv_top if hsv_top else default_hsv
         
-        cursor.execute('''
-            INSERT INTO calibrations 
-            (timestamp, 
-             scale_lat_front, scale_lat_back, scale_top_front, scale_top_back,
-             hsv_left_h_min, hsv_left_h_max, hsv_left_s_min, hsv_left_s_max, hsv_left_v_min, hsv_left_v_max,
-             hsv_top_h_min, hsv_top_h_max, hsv_top_s_min, hsv_top_s_max, hsv_top_v_min, hsv_top_v_max,
-             notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            datetime.now().isoformat(),
-            scale_lat_front, scale_lat_back, scale_top_front, scale_top_back,
-            hsv_l['h_min'], hsv_l['h_max'], hsv_l['s_min'], hsv_l['s_max'], hsv_l['v_min'], hsv_l['v_max'],
-            hsv_t['h_min'], hsv_t['h_max'], hsv_t['s_min'], hsv_t['s_max'], hsv_t['v_min'], hsv_t['v_max'],
-            notes
-        ))
+        with self._transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO calibrations 
+                (timestamp, 
+                 scale_lat_front, scale_lat_back, scale_top_front, scale_top_back,
+                 hsv_left_h_min, hsv_left_h_max, hsv_left_s_min, hsv_left_s_max, hsv_left_v_min, hsv_left_v_max,
+                 hsv_top_h_min, hsv_top_h_max, hsv_top_s_min, hsv_top_s_max, hsv_top_v_min, hsv_top_v_max,
+                 notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                datetime.now().isoformat(),
+                scale_lat_front, scale_lat_back, scale_top_front, scale_top_back,
+                hsv_l['h_min'], hsv_l['h_max'], hsv_l['s_min'], hsv_l['s_max'], hsv_l['v_min'], hsv_l['v_max'],
+                hsv_t['h_min'], hsv_t['h_max'], hsv_t['s_min'], hsv_t['s_max'], hsv_t['v_min'], hsv_t['v_max'],
+                notes
+            ))
         
-        conn.commit()
-        calib_id = cursor.lastrowid
-        conn.close()
+            calib_id = cursor.lastrowid
         return calib_id
     
     def get_latest_calibration(self) -> Optional[Dict[str, Any]]:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.row_factory = _calibration_factory
+            c = cursor.execute(_LATEST_CALIBRATION_SQL).fetchone()
         
-        cursor.execute('''
-            SELECT scale_lat_front, scale_lat_back, scale_top_front, scale_top_back,
-                   hsv_left_h_min, hsv_left_h_max, hsv_left_s_min, hsv_left_s_max, hsv_left_v_min, hsv_left_v_max,
-                   hsv_top_h_min, hsv_top_h_max, hsv_top_s_min, hsv_top_s_max, hsv_top_v_min, hsv_top_v_max,
-                   timestamp
-            FROM calibrations ORDER BY timestamp DESC LIMIT 1
-        ''')
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if not result: return None
+        if not c: return None
         
         return {
-            'scale_lat_front': result[0], 'scale_lat_back': result[1],
-            'scale_top_front': result[2], 'scale_top_back': result[3],
-            'hsv_left': {'h_min': result[4], 'h_max': result[5], 's_min': result[6], 's_max': result[7], 'v_min': result[8], 'v_max': result[9]},
-            'hsv_top': {'h_min': result[10], 'h_max': result[11], 's_min': result[12], 's_max': result[13], 'v_min': result[14], 'v_max': result[15]},
-            'timestamp': result[16]
+            'scale_lat_front': c.scale_lat_front, 'scale_lat_back': c.scale_lat_back,
+            'scale_top_front': c.scale_top_front, 'scale_top_back': c.scale_top_back,
+            'hsv_left': {'h_min': c.hsv_left_h_min, 'h_max': c.hsv_left_h_max, 's_min': c.hsv_left_s_min, 's_max': c.hsv_left_s_max, 'v_min': c.hsv_left_v_min, 'v_max': c.hsv_left_v_max},
+            'hsv_top': {'h_min': c.hsv_top_h_min, 'h_max': c.hsv_top_h_max, 's_min': c.hsv_top_s_min, 's_max': c.hsv_top_s_max, 'v_min': c.hsv_top_v_min, 'v_max': c.hsv_top_v_max},
+            'timestamp': c.timestamp
         }
     
    # ========================================================================
@@ -657,24 +940,13 @@ class DatabaseManager:
         if not measurement_row: return default
         if isinstance(measurement_row, dict): return measurement_row.get(field_name, default)
         
-        if self._column_cache is None: self._rebuild_column_cache()
-        
-        if field_name in self._column_cache:
-            idx = self._column_cache[field_name]
-            try:
-                value = measurement_row[idx]
-                return value if value is not None else default
-            except (IndexError, KeyError):
-                return default
-        return default
-    
-    def _rebuild_column_cache(self) -> None:
-        """Mapea los nombres de columnas a sus índices."""
+        getter = _GETTERS.get(field_name)
+        if getter is None: return default
         try:
-            self._column_cache = {col: i for i, col in enumerate(MEASUREMENT_COLUMNS)}
-        except Exception as e:
-            logger.error(f"Error reconstruyendo cache de columnas: {e}")
-            self._column_cache = {}
+            value = getter(measurement_row)
+        except (IndexError, TypeError):
+            return default
+        return default if value is None else value
             
     def get_next_fish_number(self, batch_id: Optional[str] = None) -> int:
             """
@@ -682,20 +954,22 @@ class DatabaseManager:
             basado en los registros del día actual.
             """
             try:
-                
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
+                with self._lock:
+                    cursor = self._conn.cursor()
 
                     if batch_id:
                         query = "SELECT COUNT(*) FROM measurements WHERE COALESCE(batch_id, '') = ?"
                         cursor.execute(query, (batch_id,))
-                    else:
-                        today_str = datetime.now().strftime('%Y-%m-%d')
-                        query = "SELECT COUNT(*) FROM measurements WHERE timestamp LIKE ?"
-                        cursor.execute(query, (f"{today_str}%",))
+                        count = cursor.fetchone()[0]
+                        return count + 1
                     
-                    count = cursor.fetchone()[0]
-                    return count + 1
+                    # Sin tanda: el conteo del día se mantiene en memoria y solo
+                    # se consulta al cambiar de día o tras invalidarse.
+                    today = date.today().isoformat()
+                    if self._today_date != today:
+                        self._today_count = self.get_today_measurements_count()
+                        self._today_date = today
+                    return self._today_count + 1
             except Exception as e:
                 logger.error(f"Error calculando siguiente ID secuencial: {e}")
                 return 1 
@@ -703,8 +977,8 @@ class DatabaseManager:
     def get_distinct_batches(self) -> List[str]:
         """Retorna las tandas existentes ordenadas por uso reciente."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 cursor.execute(
                     """
                     SELECT COALESCE(batch_id, '') AS batch_id, MAX(timestamp) AS last_ts
@@ -723,9 +997,8 @@ class DatabaseManager:
     def get_batch_summaries(self) -> List[Dict[str, Any]]:
         """Obtiene resumen por tanda: cantidad y rango temporal."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            with self._lock:
+                cursor = self._conn.cursor()
                 cursor.execute(
                     """
                     SELECT
@@ -759,8 +1032,7 @@ class DatabaseManager:
         if not old_batch_id or not new_batch_id or old_batch_id == new_batch_id:
             return 0
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._transaction() as cursor:
                 cursor.execute(
                     """
                     UPDATE measurements
@@ -769,7 +1041,6 @@ class DatabaseManager:
                     """,
                     (new_batch_id, old_batch_id),
                 )
-                conn.commit()
                 return int(cursor.rowcount or 0)
         except Exception as e:
             logger.error(f"Error renombrando tanda: {e}")
@@ -780,8 +1051,7 @@ class DatabaseManager:
         if not batch_id or not date_start or not date_end:
             return 0
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._transaction() as cursor:
                 cursor.execute(
                     """
                     UPDATE measurements
@@ -791,7 +1061,6 @@ class DatabaseManager:
                     """,
                     (batch_id, date_start, date_end),
                 )
-                conn.commit()
                 return int(cursor.rowcount or 0)
         except Exception as e:
             logger.error(f"Error asignando tanda por rango: {e}")
@@ -802,8 +1071,7 @@ class DatabaseManager:
         if not batch_id or batch_id == replacement_batch_id:
             return 0
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+            with self._transaction() as cursor:
                 cursor.execute(
                     """
                     UPDATE measurements
@@ -812,14 +1080,14 @@ class DatabaseManager:
                     """,
                     (replacement_batch_id, batch_id),
                 )
-                conn.commit()
                 return int(cursor.rowcount or 0)
         except Exception as e:
             logger.error(f"Error eliminando tanda: {e}")
             return 0
             
     def invalidate_cache(self) -> None:
-        self._column_cache = None
+        """Descarta el conteo del día en memoria; se recalcula en la próxima consulta."""
+        self._today_date = None
 
     def reset_measurements_cycle(
         self,
@@ -850,8 +1118,8 @@ class DatabaseManager:
 
         os.makedirs(backup_dir, exist_ok=True)
 
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        self._lock.acquire()
+        conn = self._conn
 
         try:
             cursor = conn.cursor()
@@ -882,7 +1150,7 @@ class DatabaseManager:
 
             summary["backup_path"] = backup_path
 
-            cursor.execute("BEGIN")
+            cursor.execute("BEGIN IMMEDIATE")
             cursor.execute("DELETE FROM measurements")
             summary["deleted_rows"] = cursor.rowcount if cursor.rowcount is not None else len(rows)
 
@@ -892,7 +1160,8 @@ class DatabaseManager:
                 # Algunos entornos SQLite no exponen sqlite_sequence en ciertas condiciones.
                 pass
 
-            conn.commit()
+            cursor.execute("COMMIT")
+            self.invalidate_cache()
 
             if delete_images:
                 for img_path in image_paths:
@@ -914,9 +1183,10 @@ class DatabaseManager:
             return summary
 
         except Exception as e:
-            conn.rollback()
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
             summary["errors"].append(str(e))
             logger.error("Error al reiniciar tanda de mediciones: %s", e, exc_info=True)
             return summary
         finally:
-            conn.close()
+            self._lock.release()
@@ -7,6 +7,29 @@ DESCRIPCIÓN: Define las constantes globales, parámetros de hardware,
 
 import os
 import logging
+from typing import Final
+
+import numpy as np
+
+# Variables de entorno leídas una sola vez al importar el módulo
+_ENV = os.environ
+MOONDREAM_API_KEY = _ENV.get("MOONDREAM_API_KEY")
+NGROK_AUTHTOKEN = _ENV.get("NGROK_AUTHTOKEN")
+
+# Constantes físicas de los medios (cm). No se recalibran en tiempo de
+# ejecución, por lo que se exponen a nivel de módulo para lecturas directas.
+DIST_AIRE: Final = 7.0
+ESP_ACRILICO: Final = 0.4
+DIST_AGUA_MAX: Final = 15.0
+
+# Índices de refracción
+N_AIRE: Final = 1.0
+N_ACRILICO: Final = 1.5
+N_AGUA: Final = 1.333
+
+# Tramos fijos (aire + acrílico) precalculados para la corrección de refracción
+_DIST_FIJA_REAL: Final = DIST_AIRE + ESP_ACRILICO
+_DIST_FIJA_APARENTE: Final = (DIST_AIRE / N_AIRE) + (ESP_ACRILICO / N_ACRILICO)
 
 class Config:
     """
@@ -18,10 +41,10 @@ class Config:
     # ==========================================================================
 
     # 1. MoonDream (IA para detección/análisis)
-    MOONDREAM_API_KEY = os.getenv("MOONDREAM_API_KEY")
+    MOONDREAM_API_KEY = MOONDREAM_API_KEY
     
     # 2. Ngrok (Para poner la API en línea)
-    NGROK_AUTHTOKEN = os.getenv("NGROK_AUTHTOKEN")
+    NGROK_AUTHTOKEN = NGROK_AUTHTOKEN
     
     # --- INSTRUCCIONES PARA WINDOWS (PowerShell como Administrador) ---
     # [System.Environment]::SetEnvironmentVariable("MOONDREAM_API_KEY", "TU_CLAVE_MOONDREAM", "Machine")
@@ -44,6 +67,10 @@ class Config:
     PREVIEW_FPS = 60
     BUFFERSIZE = 1
 
+    # Hilos del pool interno de OpenCV (global al proceso; None = valor por defecto).
+    # Con imágenes de ~2 MP el coste de despertar muchos hilos supera al trabajo.
+    OPENCV_THREADS = 2
+
     # Parámetros de salida visual
     TARGET_HEIGHT = 1080        # Altura objetivo del collage final
     TARGET_QUALITY = 100         # Calidad JPEG (0–100)
@@ -71,6 +98,10 @@ class Config:
     HSV_S_MAX = 255
     HSV_V_MIN = 40
     HSV_V_MAX = 255
+
+    # Límites empaquetados para cv2.inRange (se reconstruyen con set_hsv_ranges)
+    HSV_LOWER = np.array([HSV_H_MIN, HSV_S_MIN, HSV_V_MIN], dtype=np.uint8)
+    HSV_UPPER = np.array([HSV_H_MAX, HSV_S_MAX, HSV_V_MAX], dtype=np.uint8)
     
     # ==========================================================================
     # PARÁMETROS MORFOLÓGICOS (FORMA)
@@ -201,14 +232,14 @@ class Config:
     #  CONSTANTES DE MEDIOS (cm) ===
     # ==========================================================================
     
-    DIST_AIRE = 7.0        
-    ESP_ACRILICO = 0.4     
-    DIST_AGUA_MAX = 15.0   
-    
+    DIST_AIRE = DIST_AIRE
+    ESP_ACRILICO = ESP_ACRILICO
+    DIST_AGUA_MAX = DIST_AGUA_MAX
+
     # Índices de refracción
-    N_AIRE = 1.0
-    N_ACRILICO = 1.5
-    N_AGUA = 1.333
+    N_AIRE = N_AIRE
+    N_ACRILICO = N_ACRILICO
+    N_AGUA = N_AGUA
 
     # ==========================================================================
     # RUTAS Y DIRECTORIOS
@@ -216,19 +247,24 @@ class Config:
 
     BASE_DIR = os.path.abspath(os.getcwd())
 
-    OUT_DIR = os.path.join(BASE_DIR, "Resultados")
-    DB_DIR = os.path.join(BASE_DIR, "BaseDeDatos")
-    DB_NAME = os.path.join(DB_DIR, "database.db")
-    LOG_DIR = os.path.join(BASE_DIR, "Eventos")
+    # Rutas compuestas por concatenación directa (BASE_DIR ya es absoluta).
+    # _BASE omite el separador final para el caso de la raíz ("/" o "C:\\").
+    _SEP = os.sep
+    _BASE = BASE_DIR.rstrip(_SEP)
+
+    OUT_DIR = f"{_BASE}{_SEP}Resultados"
+    DB_DIR = f"{_BASE}{_SEP}BaseDeDatos"
+    DB_NAME = f"{DB_DIR}{_SEP}database.db"
+    LOG_DIR = f"{_BASE}{_SEP}Eventos"
 
-    CONFIG_FILE = os.path.join(BASE_DIR, "config.json")
-    LOG_FILE = os.path.join(LOG_DIR, "app.log")
+    CONFIG_FILE = f"{_BASE}{_SEP}config.json"
+    LOG_FILE = f"{LOG_DIR}{_SEP}app.log"
 
-    IMAGES_AUTO_DIR = os.path.join(OUT_DIR, "Imagenes_Automaticas")
-    IMAGES_MANUAL_DIR = os.path.join(OUT_DIR, "Imagenes_Manuales")
-    REPORTS_DIR = os.path.join(OUT_DIR, "Reportes")
-    CSV_DIR = os.path.join(OUT_DIR, "CSV")
-    GRAPHS_DIR = os.path.join(OUT_DIR, "Graficos")
+    IMAGES_AUTO_DIR = f"{OUT_DIR}{_SEP}Imagenes_Automaticas"
+    IMAGES_MANUAL_DIR = f"{OUT_DIR}{_SEP}Imagenes_Manuales"
+    REPORTS_DIR = f"{OUT_DIR}{_SEP}Reportes"
+    CSV_DIR = f"{OUT_DIR}{_SEP}CSV"
+    GRAPHS_DIR = f"{OUT_DIR}{_SEP}Graficos"
 
     # Directorios requeridos por el sistema
     DIRS_TO_CREATE = (
@@ -248,6 +284,9 @@ class Config:
 
     DEBUG_MODE = False
 
+    # Bandera de inicialización única
+    _initialized = False
+
     # ==========================================================================
     # INICIALIZACIÓN DEL SISTEMA
     # ==========================================================================
@@ -255,18 +294,23 @@ class Config:
     @classmethod
     def initialize(cls):
         """
-        Inicializa la configuración del sistema.
+        Inicializa la configuración del sistema. Solo se ejecuta una vez por proceso.
         """
-        for path in cls.DIRS_TO_CREATE:
-            os.makedirs(path, exist_ok=True)
-
-        logging.basicConfig(
-            filename=cls.LOG_FILE,
-            level=logging.DEBUG if cls.DEBUG_MODE else logging.INFO,
-            format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-            filemode="a"
-        )
+        if cls._initialized:
+            return
+        cls._initialized = True
+
+        cls._ensure_directories()
+
+        # Evita duplicar handlers si otro módulo ya configuró el logging raíz
+        if not logging.getLogger().hasHandlers():
+            # delay=True: el archivo se abre con el primer registro emitido
+            logging.basicConfig(
+                handlers=[logging.FileHandler(cls.LOG_FILE, mode="a", delay=True)],
+                level=logging.DEBUG if cls.DEBUG_MODE else logging.INFO,
+                format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S"
+            )
 
         cls.logger = logging.getLogger(__name__)
 
@@ -279,6 +323,31 @@ class Config:
         else:
             cls.logger.info("API KEY cargada correctamente.")
 
+    @classmethod
+    def _ensure_directories(cls):
+        """
+        Crea únicamente los directorios faltantes. Se lista cada carpeta padre
+        una sola vez con scandir en lugar de invocar makedirs por cada ruta.
+        """
+        listados = {}
+        for path in cls.DIRS_TO_CREATE:
+            parent, name = os.path.split(path)
+            if parent not in listados:
+                try:
+                    with os.scandir(parent) as it:
+                        listados[parent] = {e.name for e in it if e.is_dir()}
+                except FileNotFoundError:
+                    listados[parent] = set()
+            if name in listados[parent]:
+                continue
+            try:
+                os.mkdir(path)
+            except FileExistsError:
+                pass
+            except FileNotFoundError:
+                os.makedirs(path, exist_ok=True)
+            listados[parent].add(name)
+
     # ==========================================================================
     # UTILIDADES
     # ==========================================================================
@@ -293,28 +362,21 @@ class Config:
             return max(0.0001, float(escala_frente or 0.0001))
 
         proporcion = valor_y / max_y
-        
+
         if es_cenital:
             # Cámara Cenital: Arriba (0) es LEJOS, Abajo (max) es CERCA
-            p_escala = 1.0 - proporcion 
-            p_agua = 1.0 - proporcion    
+            p = 1.0 - proporcion
         else:
             # Cámara Lateral: Arriba (0) es CERCA, Abajo (max) es LEJOS
-            p_escala = proporcion     
-            p_agua = proporcion          
+            p = proporcion
 
         # 1. Escala base interpolada (calibración en aire)
-        escala_aire = escala_frente + (escala_fondo - escala_frente) * p_escala
+        escala_aire = escala_frente + (escala_fondo - escala_frente) * p
 
         # 2. CÁLCULO DE REFRACCIÓN (Ley de Snell simplificada)
-        dist_agua_actual = Config.DIST_AGUA_MAX * p_agua
-        dist_real = Config.DIST_AIRE + Config.ESP_ACRILICO + dist_agua_actual
-        
-        dist_aparente = (
-            (Config.DIST_AIRE / Config.N_AIRE) +
-            (Config.ESP_ACRILICO / Config.N_ACRILICO) +
-            (dist_agua_actual / Config.N_AGUA)
-        )
+        dist_agua_actual = DIST_AGUA_MAX * p
+        dist_real = _DIST_FIJA_REAL + dist_agua_actual
+        dist_aparente = _DIST_FIJA_APARENTE + dist_agua_actual / N_AGUA
 
         if dist_real <= 0:
             return max(0.0001, float(escala_aire or 0.0001))
@@ -6,6 +6,7 @@ DESCRIPCIÓN: Cliente HTTP encargado de la adquisición de telemetría ambiental
              sistema local, normalizando los datos para su persistencia.
 """
 
+import threading
 import requests
 import logging
 
@@ -28,15 +29,35 @@ class SensorService:
         "Oxigeno Disuelto": "api_do_mg_l"
     }
 
-    @staticmethod
-    def get_water_quality_data():
+    # Sesión HTTP compartida (keep-alive) creada bajo demanda
+    _session = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def _get_session(cls):
+        """
+        Retorna la sesión HTTP reutilizable, evitando un nuevo handshake TLS
+        en cada consulta de telemetría.
+        """
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    session = requests.Session()
+                    session.headers.update({"Accept": "application/json"})
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4)
+                    session.mount("https://", adapter)
+                    cls._session = session
+        return cls._session
+
+    @classmethod
+    def get_water_quality_data(cls):
         """
         Consulta la API, procesa la lista de diccionarios y retorna
         un diccionario plano listo para DatabaseManager.
         """
         try:
             # 1. Adquisición de Datos
-            response = requests.get(SensorService.API_URL, timeout=5)
+            response = cls._get_session().get(cls.API_URL, timeout=5)
             
             if response.status_code != 200:
                 logger.error(f"Fallo en API IoT: HTTP {response.status_code}.")
@@ -53,15 +74,26 @@ class SensorService:
                 flat_data = raw_data
 
             # 3. Transformación y Mapeo 
-            db_data = {}
-            for api_key, db_column in SensorService.FIELD_MAPPING.items():
-                value = flat_data.get(api_key, 0.0)
-                
-                try:
+            # Parte de la plantilla en cero y solo escribe los campos recibidos
+            db_data = _ZERO_DB.copy()
+            get = flat_data.get
+            for api_key, db_column in _FIELD_ITEMS:
+                value = get(api_key)
+                if value is None:
+                    continue
+
+                if isinstance(value, (int, float)):
                     db_data[db_column] = float(value)
-                except (ValueError, TypeError):
-                    db_data[db_column] = 0.0
-                    logger.warning(f"Dato no numerico recibido para {api_key}: {value}.")
+                    continue
+
+                if isinstance(value, str):
+                    try:
+                        db_data[db_column] = float(value)
+                        continue
+                    except ValueError:
+                        pass
+
+                logger.warning(f"Dato no numerico recibido para {api_key}: {value}.")
 
             logger.info("Telemetria ambiental sincronizada correctamente.")
             return db_data
@@ -74,4 +106,12 @@ class SensorService:
             return {}
         except Exception as e:
             logger.error(f"Error critico en servicio de sensores: {e}.")
-            return {}
\ No newline at end of file
+            return {}
+
+
+# Pares (clave API, columna BD) precalculados para el bucle de transformación
+_FIELD_ITEMS = tuple(SensorService.FIELD_MAPPING.items())
+
+# Columnas BD en cero: forma base de cada lectura exitosa
+_DB_COLUMNS = tuple(SensorService.FIELD_MAPPING.values())
+_ZERO_DB = dict.fromkeys(_DB_COLUMNS, 0.0)
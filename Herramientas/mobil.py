@@ -9,30 +9,60 @@ INTEGRACIÓN: Actúa como un servicio secundario que alimenta la cola de procesa
              de la aplicación principal.
 """
 
-from flask import Flask, jsonify, make_response, render_template_string, request
-from PIL import Image, ImageDraw, ImageFont, UnidentifiedImageError
-from queue import Full, Queue
+import cv2
+import numpy as np
+from flask import Flask, Request, Response, abort, jsonify, request
+from PIL import Image, UnidentifiedImageError, features
+from collections import deque
+import gzip
 import logging
 import os
 import secrets
 import socket
+import threading
 import time
 import uuid
 from pathlib import Path
+from tempfile import SpooledTemporaryFile
 from urllib.parse import urlencode
 
 from Config.Config import Config
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
 # CONFIGURACIÓN DE FLASK
 # ============================================================================
 
-flask_app = Flask(__name__)
-
 MAX_UPLOAD_MB = 16
-flask_app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+# Hilos fijos del servidor WSGI (waitress); acota memoria ante ráfagas de subidas
+SERVER_THREADS = 8
+
+
+class _MobileRequest(Request):
+    """
+    Request que mantiene en memoria los archivos subidos hasta el límite del
+    cuerpo (MAX_CONTENT_LENGTH), en lugar de volcarlos a disco desde 500 KB.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledTemporaryFile(max_size=MAX_UPLOAD_BYTES, mode="rb+")
+
+
+flask_app = Flask(__name__)
+flask_app.request_class = _MobileRequest
+flask_app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
 
 MAX_NOTES_LENGTH = 240
 MAX_FIELD_LENGTH = 32
@@ -50,13 +80,24 @@ MEASUREMENT_LIMITS = {
     "alto": (0.0, 150.0),
 }
 
-# Cola thread-safe para comunicación con la app principal
-mobile_capture_queue = Queue(maxsize=10)
+# Buffer de un solo lugar para la app principal: la última captura reemplaza
+# a la pendiente (protegido por _mcq_lock)
+MOBILE_QUEUE_CAPACITY = 1
+mobile_capture_queue = deque(maxlen=MOBILE_QUEUE_CAPACITY)
+_mcq_lock = threading.Lock()
 
 # Token temporal usado por la URL del QR
 _mobile_access_token = os.getenv("FISHTRACE_MOBILE_TOKEN") or secrets.token_urlsafe(24)
 _mobile_access_token_issued_at = time.time()
 
+# Páginas HTML renderizadas y precomprimidas (se llenan en el primer uso)
+_PAGE_CACHE = {}
+
+# IP local detectada (se resuelve en el primer uso y se refresca tras el TTL)
+_LOCAL_IP = None
+_LOCAL_IP_AT = 0.0
+LOCAL_IP_TTL_S = 60.0
+
 # Dimensiones objetivo para el collage
 TARGET_HEIGHT = Config.TARGET_HEIGHT
 TARGET_QUALITY = Config.TARGET_QUALITY
@@ -423,6 +464,11 @@ MOBILE_PAGE_HTML = """
 
     <script>
         const STATUS_POLL_MS = {{ status_poll_ms|int }};
+        const TARGET_HEIGHT = {{ target_height|int }};
+        const COMPRESS_MIN_BYTES = 500 * 1024;
+        const COMPRESS_TARGET_BYTES = 300 * 1024;
+        const JPEG_QUALITY_START = 0.85;
+        const JPEG_QUALITY_FLOOR = 0.6;
         const HISTORY_KEY = 'fishtrace-mobile-history';
         const ACCESS_PARAM = new URLSearchParams(window.location.search).get('access') || '';
 
@@ -443,6 +489,8 @@ MOBILE_PAGE_HTML = """
         const historyList = document.getElementById('historyList');
 
         let busy = false;
+        // Compresiones iniciadas al seleccionar la foto (input -> Promise<File>)
+        const pendingCompression = new WeakMap();
         let serverAcceptingUploads = false;
 
         function setMessage(message, tone = 'info') {
@@ -495,8 +543,17 @@ MOBILE_PAGE_HTML = """
             renderHistory();
         }
 
+        function releasePreview(preview) {
+            if (preview.dataset.objectUrl) {
+                URL.revokeObjectURL(preview.dataset.objectUrl);
+                delete preview.dataset.objectUrl;
+            }
+        }
+
         function clearSelection(input, preview, wrapper, meta, button) {
             input.value = '';
+            pendingCompression.delete(input);
+            releasePreview(preview);
             preview.removeAttribute('src');
             wrapper.style.display = 'none';
             meta.textContent = '';
@@ -512,15 +569,18 @@ MOBILE_PAGE_HTML = """
                     return;
                 }
 
-                const reader = new FileReader();
-                reader.onload = (loadEvent) => {
-                    preview.src = loadEvent.target.result;
-                    wrapper.style.display = 'block';
-                    meta.textContent = formatFileMeta(file);
-                    button.disabled = false;
-                    updateSendState();
-                };
-                reader.readAsDataURL(file);
+                // Comprime en segundo plano mientras el usuario completa el formulario
+                pendingCompression.set(input, compressImage(file).catch(() => file));
+
+                // Blob URL: vista previa sin copiar la imagen a una cadena base64
+                releasePreview(preview);
+                const url = URL.createObjectURL(file);
+                preview.dataset.objectUrl = url;
+                preview.src = url;
+                wrapper.style.display = 'block';
+                meta.textContent = formatFileMeta(file);
+                button.disabled = false;
+                updateSendState();
             });
         }
 
@@ -529,24 +589,47 @@ MOBILE_PAGE_HTML = """
                 return file;
             }
 
-            if (file.size < 1500000) {
+            if (file.size < COMPRESS_MIN_BYTES) {
                 return file;
             }
 
-            const bitmap = await createImageBitmap(file);
-            const maxDimension = 2200;
-            const ratio = Math.min(1, maxDimension / Math.max(bitmap.width, bitmap.height));
+            // El servidor normaliza la altura a TARGET_HEIGHT; no tiene sentido enviar mas
+            let bitmap = await createImageBitmap(file);
+            const ratio = Math.min(1, TARGET_HEIGHT / bitmap.height);
             const width = Math.max(1, Math.round(bitmap.width * ratio));
             const height = Math.max(1, Math.round(bitmap.height * ratio));
+
+            if (ratio < 1) {
+                try {
+                    const resized = await createImageBitmap(bitmap, {
+                        resizeWidth: width,
+                        resizeHeight: height,
+                        resizeQuality: 'high'
+                    });
+                    bitmap.close();
+                    bitmap = resized;
+                } catch (error) {
+                    // Sin soporte de opciones de redimension: drawImage escala abajo
+                }
+            }
+
             const canvas = document.createElement('canvas');
             canvas.width = width;
             canvas.height = height;
 
             const context = canvas.getContext('2d');
             context.drawImage(bitmap, 0, 0, width, height);
+            bitmap.close();
+
+            const encode = (quality) => new Promise((resolve) => canvas.toBlob(resolve, 'image/jpeg', quality));
+            // Baja la calidad en pasos de 0.05 hasta el objetivo de peso o el piso
+            const steps = Math.round((JPEG_QUALITY_START - JPEG_QUALITY_FLOOR) / 0.05);
+            let blob = await encode(JPEG_QUALITY_START);
+            for (let step = 1; step <= steps && blob && blob.size > COMPRESS_TARGET_BYTES; step++) {
+                blob = await encode(JPEG_QUALITY_START - step * 0.05);
+            }
 
-            const blob = await new Promise((resolve) => canvas.toBlob(resolve, 'image/jpeg', 0.88));
-            if (!blob) {
+            if (!blob || blob.size >= file.size) {
                 return file;
             }
 
@@ -570,8 +653,6 @@ MOBILE_PAGE_HTML = """
 
                 if (data.accepting_uploads) {
                     setServerState('Servidor listo para recibir capturas', 'success');
-                } else if (data.queue_size >= data.queue_capacity) {
-                    setServerState('Servidor ocupado, espere a que se vacie la cola', 'warning');
                 } else {
                     setServerState('Servidor en verificacion', 'info');
                 }
@@ -625,9 +706,10 @@ MOBILE_PAGE_HTML = """
 
             try {
                 const formData = buildFormData();
-                formData.append('foto1', await compressImage(input1.files[0]));
+                const prepared = (input) => pendingCompression.get(input) || compressImage(input.files[0]);
+                formData.append('foto1', await prepared(input1));
                 if (input2.files[0]) {
-                    formData.append('foto2', await compressImage(input2.files[0]));
+                    formData.append('foto2', await prepared(input2));
                 }
 
                 const response = await fetch('/upload', {
@@ -713,15 +795,26 @@ UNAUTHORIZED_PAGE_HTML = """
 # ============================================================================
 
 def get_local_ip():
-    """Obtiene la IP local del servidor para mostrar al usuario."""
+    """
+    Obtiene la IP local del servidor para mostrar al usuario.
+    El resultado se cachea LOCAL_IP_TTL_S segundos para recoger cambios de
+    red; el respaldo 127.0.0.1 no se cachea, para reintentar luego.
+    """
+    global _LOCAL_IP, _LOCAL_IP_AT
+    now = time.monotonic()
+    if _LOCAL_IP is not None and now - _LOCAL_IP_AT < LOCAL_IP_TTL_S:
+        return _LOCAL_IP
     try:
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.connect(("8.8.8.8", 80))
-        ip = sock.getsockname()[0]
-        sock.close()
-        return ip
+        try:
+            sock.connect(("8.8.8.8", 80))
+            _LOCAL_IP = sock.getsockname()[0]
+            _LOCAL_IP_AT = now
+        finally:
+            sock.close()
+        return _LOCAL_IP
     except Exception:
-        return "127.0.0.1"
+        return _LOCAL_IP or "127.0.0.1"
 
 
 def configure_mobile_access_token(token=None):
@@ -745,10 +838,26 @@ def build_mobile_access_url(host, port=5000):
 
 
 def _get_queue_size():
-    try:
-        return mobile_capture_queue.qsize()
-    except NotImplementedError:
-        return 0
+    return len(mobile_capture_queue)
+
+
+def enqueue_mobile_capture(item):
+    """
+    Publica una captura con semántica "la última gana".
+
+    Si había una captura pendiente sin consumir se reemplaza y se retorna,
+    para que el llamador libere sus recursos; en caso contrario retorna None.
+    """
+    with _mcq_lock:
+        replaced = mobile_capture_queue.popleft() if mobile_capture_queue else None
+        mobile_capture_queue.append(item)
+        return replaced
+
+
+def pop_mobile_capture():
+    """Extrae la captura pendiente o retorna None si no hay ninguna."""
+    with _mcq_lock:
+        return mobile_capture_queue.popleft() if mobile_capture_queue else None
 
 
 def _safe_unlink(path):
@@ -840,54 +949,88 @@ def _parse_measurements():
     return cleaned, errors
 
 
-def resize_keep_aspect(image, target_height):
-    """Redimensiona imagen manteniendo aspect ratio."""
-    if image.height <= 0 or image.width <= 0:
+def _scaled_width(width, height, target_height):
+    """Ancho resultante al llevar la imagen a target_height manteniendo aspecto."""
+    if height <= 0 or width <= 0:
         raise ValueError("La imagen no tiene dimensiones validas.")
-    aspect_ratio = image.width / image.height
-    new_width = max(1, int(target_height * aspect_ratio))
-    return image.resize((new_width, target_height), Image.Resampling.LANCZOS)
-
+    return max(1, int(target_height * (width / height)))
+
+
+def resize_keep_aspect(image, target_height, out=None):
+    """
+    Redimensiona imagen manteniendo aspect ratio.
+    Acepta np.ndarray o imagen PIL y retorna siempre un np.ndarray. Si se
+    entrega `out` (p. ej. una franja del collage), el resultado se escribe ahí.
+    """
+    arr = np.asarray(image)
+    height, width = arr.shape[:2]
+    new_width = _scaled_width(width, height, target_height)
+    interp = cv2.INTER_AREA if new_width < width else cv2.INTER_LINEAR
+    return cv2.resize(arr, (new_width, target_height), dst=out, interpolation=interp)
+
+
+def add_label_to_image(image, label_text, inplace=False):
+    """
+    Agrega etiqueta en la esquina superior de la imagen.
+    Acepta un np.ndarray RGB o una imagen PIL; dibuja con primitivas de OpenCV
+    y retorna el mismo tipo recibido.
+    """
+    is_pil = isinstance(image, Image.Image)
+    if is_pil:
+        arr = np.array(image)
+    else:
+        arr = image if inplace else image.copy()
 
-def add_label_to_image(image, label_text):
-    """Agrega etiqueta en la esquina superior de la imagen."""
-    img_copy = image.copy()
-    draw = ImageDraw.Draw(img_copy)
     bbox_height = 40
-    draw.rectangle([(0, 0), (img_copy.width, bbox_height)], fill=(0, 0, 0, 180))
-
-    try:
-        font = ImageFont.truetype("arial.ttf", 24)
-    except OSError:
-        font = ImageFont.load_default()
-
-    draw.text((10, 10), label_text, fill=(255, 255, 255), font=font)
-    return img_copy
+    cv2.rectangle(arr, (0, 0), (arr.shape[1], bbox_height), (0, 0, 0), -1)
+    cv2.putText(
+        arr, label_text, (10, 28), cv2.FONT_HERSHEY_SIMPLEX,
+        0.8, (255, 255, 255), 2, cv2.LINE_AA
+    )
+    return Image.fromarray(arr) if is_pil else arr
 
 
 def cleanup_temp_files(directory, pattern="MOB_"):
     """Limpia archivos temporales antiguos (>1 hora)."""
     try:
-        now = time.time()
-        for file in Path(directory).glob(f"{pattern}*"):
-            if now - file.stat().st_mtime > MAX_IMAGE_AGE_SECONDS:
-                file.unlink()
-                logger.info(f"Limpieza: {file.name} eliminado")
+        cutoff = time.time() - MAX_IMAGE_AGE_SECONDS
+        # scandir reutiliza los atributos de la enumeración (sin stat extra en Windows)
+        with os.scandir(directory) as it:
+            for entry in it:
+                name = entry.name
+                if not name.startswith(pattern) or not entry.is_file(follow_symlinks=False):
+                    continue
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    try:
+                        os.unlink(entry.path)
+                    except OSError as e:
+                        logger.warning(f"No se pudo eliminar {name}: {e}")
+                    else:
+                        logger.info(f"Limpieza: {name} eliminado")
     except Exception as e:
         logger.warning(f"Error en limpieza: {e}")
 
 
-def _build_temp_path(key, extension):
+def _build_output_path(prefix="MOBILE"):
     return os.path.join(
         Config.IMAGES_MANUAL_DIR,
-        f"MOB_{int(time.time() * 1000)}_{key}_{uuid.uuid4().hex[:8]}{extension}"
+        f"{prefix}_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}.jpg"
     )
 
 
-def _build_output_path(prefix="MOBILE"):
-    return os.path.join(
-        Config.IMAGES_MANUAL_DIR,
-        f"{prefix}_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}.jpg"
+def _save_jpeg(image, path):
+    """
+    Codifica la captura procesada: sin pasada extra de optimización Huffman,
+    croma 4:2:0 como las cámaras móviles y sin metadatos EXIF.
+    """
+    image.save(
+        path,
+        format="JPEG",
+        quality=TARGET_QUALITY,
+        optimize=False,
+        subsampling=2,
+        progressive=False,
+        exif=b"",
     )
 
 
@@ -904,77 +1047,146 @@ def _validate_upload(file_obj, key):
 
 
 def _load_valid_image(file_obj, key):
-    extension = _validate_upload(file_obj, key)
-    temp_path = _build_temp_path(key, extension)
-    file_obj.save(temp_path)
+    _validate_upload(file_obj, key)
 
+    # Se decodifica directamente desde el stream de Flask, sin archivo temporal
+    stream = file_obj.stream
     try:
-        with Image.open(temp_path) as img_check:
+        stream.seek(0, os.SEEK_END)
+        size_bytes = stream.tell()
+        stream.seek(0)
+
+        with Image.open(stream) as img_check:
             img_check.verify()
 
-        with Image.open(temp_path) as verified_image:
-            rgb_image = verified_image.convert("RGB")
-            width, height = rgb_image.size
+        stream.seek(0)
+        with Image.open(stream) as verified_image:
+            width, height = verified_image.size
             if width < MIN_IMAGE_WIDTH or height < MIN_IMAGE_HEIGHT:
                 raise ValueError(
                     f"{key}: resolucion insuficiente. Minimo {MIN_IMAGE_WIDTH}x{MIN_IMAGE_HEIGHT}."
                 )
 
+            # JPEG: decodificar con escalado DCT (1/2, 1/4, 1/8) sin bajar del
+            # tamaño final del collage; el resize posterior procesa menos datos
+            if verified_image.format == "JPEG" and height > TARGET_HEIGHT:
+                target_width = max(1, int(TARGET_HEIGHT * width / height))
+                verified_image.draft("RGB", (target_width, TARGET_HEIGHT))
+
+            rgb_image = verified_image.convert("RGB")
+
         metadata = {
             "field": key,
             "source_name": Path(file_obj.filename).name,
             "mime_type": file_obj.mimetype or "",
             "width": width,
             "height": height,
-            "size_bytes": os.path.getsize(temp_path),
+            "size_bytes": size_bytes,
         }
-        return rgb_image, temp_path, metadata
+        return rgb_image, metadata
     except (UnidentifiedImageError, OSError, ValueError) as exc:
-        _safe_unlink(temp_path)
         raise ValueError(f"{key}: imagen invalida ({exc})") from exc
 
 
 def _save_processed_capture(received_images):
     result_path = _build_output_path("MOBILE")
 
+    # El pipeline trabaja con arreglos RGB; solo se envuelve en PIL para codificar
     if len(received_images) == 2:
-        img1_resized = resize_keep_aspect(received_images[0][0], TARGET_HEIGHT)
-        img2_resized = resize_keep_aspect(received_images[1][0], TARGET_HEIGHT)
-
-        total_width = img1_resized.width + img2_resized.width
-        collage = Image.new("RGB", (total_width, TARGET_HEIGHT))
-        collage.paste(img1_resized, (0, 0))
-        collage.paste(img2_resized, (img1_resized.width, 0))
-        final_image = add_label_to_image(collage, "CAPTURA REMOTA (LATERAL + CENITAL)")
+        img1, img2 = received_images[0][0], received_images[1][0]
+        width1 = _scaled_width(img1.width, img1.height, TARGET_HEIGHT)
+        width2 = _scaled_width(img2.width, img2.height, TARGET_HEIGHT)
+
+        # Cada vista se redimensiona directamente sobre su franja del collage
+        collage = np.empty((TARGET_HEIGHT, width1 + width2, 3), dtype=np.uint8)
+        resize_keep_aspect(img1, TARGET_HEIGHT, out=collage[:, :width1])
+        resize_keep_aspect(img2, TARGET_HEIGHT, out=collage[:, width1:])
+        final_array = add_label_to_image(collage, "CAPTURA REMOTA (LATERAL + CENITAL)", inplace=True)
     else:
         img, label = received_images[0]
         img_resized = resize_keep_aspect(img, TARGET_HEIGHT)
         etiqueta = "LATERAL" if label == "foto1" else "CENITAL"
-        final_image = add_label_to_image(img_resized, f"CAPTURA REMOTA ({etiqueta})")
+        final_array = add_label_to_image(img_resized, f"CAPTURA REMOTA ({etiqueta})", inplace=True)
 
-    final_image.save(result_path, quality=TARGET_QUALITY, optimize=True)
-    final_image.close()
+    final_image = Image.fromarray(final_array)
+    try:
+        _save_jpeg(final_image, result_path)
+    except Exception:
+        # Una escritura parcial no debe quedar en disco esperando al barrido
+        _safe_unlink(result_path)
+        raise
+    finally:
+        final_image.close()
     return result_path
 
 
+def _get_cached_page(name):
+    """
+    Renderiza una sola vez cada página HTML (sus variables son constantes del
+    módulo) y conserva el cuerpo plano y sus variantes precomprimidas
+    (Brotli solo si la librería está instalada).
+    """
+    page = _PAGE_CACHE.get(name)
+    if page is None:
+        if name == "mobile":
+            html = flask_app.jinja_env.from_string(MOBILE_PAGE_HTML).render(
+                max_upload_mb=MAX_UPLOAD_MB,
+                max_notes_length=MAX_NOTES_LENGTH,
+                status_poll_ms=STATUS_POLL_MS,
+                target_height=TARGET_HEIGHT,
+            )
+        else:
+            html = UNAUTHORIZED_PAGE_HTML
+        raw = html.encode("utf-8")
+        page = {
+            "identity": raw,
+            "gzip": gzip.compress(raw, compresslevel=9),
+        }
+        if brotli is not None:
+            page["br"] = brotli.compress(raw, quality=11)
+        _PAGE_CACHE[name] = page
+    return page
+
+
+def _html_response(name, status=200):
+    """Entrega una página cacheada negociando Content-Encoding con el cliente."""
+    page = _get_cached_page(name)
+    accepted = request.accept_encodings
+
+    encoding = next(
+        (enc for enc in ("br", "gzip") if enc in page and accepted[enc] > 0),
+        None,
+    )
+    if encoding is not None:
+        response = Response(page[encoding], status=status, mimetype="text/html")
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = Response(page["identity"], status=status, mimetype="text/html")
+
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
 # ============================================================================
 # RUTAS DE FLASK
 # ============================================================================
 
+@flask_app.before_request
+def _reject_oversized_request():
+    """Rechaza por Content-Length antes de leer cualquier byte del cuerpo."""
+    if request.content_length is not None and request.content_length > MAX_UPLOAD_BYTES:
+        abort(413)
+
+
 @flask_app.route("/", methods=["GET"])
 def mobile_page():
     """Página HTML responsive para captura móvil."""
     if not _is_access_authorized():
-        return render_template_string(UNAUTHORIZED_PAGE_HTML), 403
-
-    response = make_response(
-        render_template_string(
-            MOBILE_PAGE_HTML,
-            max_upload_mb=MAX_UPLOAD_MB,
-            max_notes_length=MAX_NOTES_LENGTH,
-            status_poll_ms=STATUS_POLL_MS,
-        )
-    )
+        return _html_response("unauthorized", 403)
+
+    response = _html_response("mobile")
+    # Privada: la página solo se entrega con un token válido
+    response.headers["Cache-Control"] = "private, max-age=300"
     response.set_cookie(
         MOBILE_TOKEN_COOKIE,
         get_mobile_access_token(),
@@ -988,7 +1200,6 @@ def mobile_page():
 @flask_app.route("/upload", methods=["POST"])
 def upload_from_mobile():
     """Recibe imagen y medidas del móvil, procesa y notifica a la app principal."""
-    temp_paths = []
     received_images = []
     result_path = None
     request_id = uuid.uuid4().hex[:12]
@@ -1000,7 +1211,6 @@ def upload_from_mobile():
             return auth_error
 
         _ensure_manual_dir()
-        cleanup_temp_files(Config.IMAGES_MANUAL_DIR)
 
         medidas, measurement_errors = _parse_measurements()
         if measurement_errors:
@@ -1026,8 +1236,7 @@ def upload_from_mobile():
                 continue
 
             try:
-                image, temp_path, metadata = _load_valid_image(file_obj, key)
-                temp_paths.append(temp_path)
+                image, metadata = _load_valid_image(file_obj, key)
                 received_images.append((image, key))
                 image_metadata.append(metadata)
             except ValueError as exc:
@@ -1065,34 +1274,29 @@ def upload_from_mobile():
             }
         }
 
-        try:
-            mobile_capture_queue.put(paquete_datos, block=False)
+        replaced = enqueue_mobile_capture(paquete_datos)
+        if replaced is not None:
+            _safe_unlink(replaced.get("path"))
             logger.info(
-                "Captura movil encolada | request_id=%s | cola=%s/%s | fotos=%s",
+                "Captura movil pendiente reemplazada | request_id=%s | reemplazada=%s",
                 request_id,
-                _get_queue_size(),
-                mobile_capture_queue.maxsize,
-                len(received_images),
-            )
-        except Full:
-            _safe_unlink(result_path)
-            result_path = None
-            return _json_error(
-                "El sistema esta ocupado en este momento. Espere unos segundos e intente de nuevo.",
-                503,
-                code="queue_full",
-                details={
-                    "queue_size": _get_queue_size(),
-                    "queue_capacity": mobile_capture_queue.maxsize,
-                },
+                replaced.get("request_id"),
             )
 
+        logger.info(
+            "Captura movil encolada | request_id=%s | cola=%s/%s | fotos=%s",
+            request_id,
+            _get_queue_size(),
+            MOBILE_QUEUE_CAPACITY,
+            len(received_images),
+        )
+
         return jsonify({
             "status": "success",
             "message": "Datos encolados correctamente.",
             "request_id": request_id,
             "queue_size": _get_queue_size(),
-            "queue_capacity": mobile_capture_queue.maxsize,
+            "queue_capacity": MOBILE_QUEUE_CAPACITY,
             "warnings": image_errors,
         }), 200
 
@@ -1112,8 +1316,6 @@ def upload_from_mobile():
                 image.close()
             except Exception:
                 pass
-        for temp_path in temp_paths:
-            _safe_unlink(temp_path)
 
 
 @flask_app.route("/status", methods=["GET"])
@@ -1124,13 +1326,13 @@ def mobile_status():
         return auth_error
 
     queue_size = _get_queue_size()
-    queue_capacity = mobile_capture_queue.maxsize
+    queue_capacity = MOBILE_QUEUE_CAPACITY
     return jsonify({
         "status": "online",
         "server": "FishTrace Mobile Capture",
         "queue_size": queue_size,
         "queue_capacity": queue_capacity,
-        "accepting_uploads": queue_size < queue_capacity,
+        "accepting_uploads": True,
         "token_age_seconds": int(time.time() - _mobile_access_token_issued_at),
     })
 
@@ -1159,12 +1361,34 @@ def request_entity_too_large(error):
 # INICIALIZACIÓN
 # ============================================================================
 
+def _log_jpeg_backend():
+    """Registra el códec JPEG de Pillow; sin libjpeg-turbo el upload es mucho más lento."""
+    try:
+        turbo = features.check_feature("libjpeg_turbo")
+        version = features.version("jpg") or "desconocida"
+    except Exception as exc:
+        logger.warning(f"No se pudo inspeccionar el codec JPEG de Pillow: {exc}")
+        return
+
+    if turbo:
+        logger.info(f"Codec JPEG: libjpeg-turbo {version} (SIMD).")
+    else:
+        logger.warning(
+            f"Codec JPEG sin libjpeg-turbo ({version}). "
+            "Instale un Pillow compilado con libjpeg-turbo para acelerar las subidas."
+        )
+
+
 def start_flask_server(host="0.0.0.0", port=5000, debug=False):
     """Inicia el servidor Flask."""
     _ensure_manual_dir()
+    # Las subidas ya no generan temporales; se barren restos de versiones previas
+    cleanup_temp_files(Config.IMAGES_MANUAL_DIR)
     local_ip = get_local_ip()
     access_url = build_mobile_access_url(local_ip, port)
 
+    _log_jpeg_backend()
+
     logger.info("=" * 70)
     logger.info("SERVIDOR DE CAPTURA MOVIL INICIADO")
     logger.info("=" * 70)
@@ -1173,6 +1397,14 @@ def start_flask_server(host="0.0.0.0", port=5000, debug=False):
     logger.info(f"  🌐 http://localhost:{port} (solo en esta PC)")
     logger.info("=" * 70)
 
+    if waitress_serve is not None and not debug:
+        # Pool fijo de hilos: evita crear y destruir un hilo por petición
+        waitress_serve(flask_app, host=host, port=port, threads=SERVER_THREADS)
+        return
+
+    if not debug:
+        logger.warning("waitress no instalado; usando el servidor de desarrollo de Flask.")
+
     flask_app.run(
         host=host,
         port=port,
@@ -1183,6 +1415,9 @@ def start_flask_server(host="0.0.0.0", port=5000, debug=False):
 
 
 if __name__ == "__main__":
+    cv2.setUseOptimized(True)
+    if Config.OPENCV_THREADS is not None:
+        cv2.setNumThreads(Config.OPENCV_THREADS)
     start_flask_server(
         host="0.0.0.0",
         port=5000,
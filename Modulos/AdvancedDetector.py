@@ -6,13 +6,18 @@ DESCRIPCIÓN: Actúa como orquestador central de las capacidades de Inteligencia
              modelos de segmentación (SAM) para la extracción precisa de siluetas.
 """
 
+import base64
+import importlib.metadata
 import cv2
 import logging
+import threading
 import numpy as np
-from typing import Optional, List, Dict, Any, Tuple
+import requests
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple, Callable
 from dataclasses import dataclass
-from PIL import Image
 import moondream as md_lib 
+from moondream.types import Base64EncodedImage
 
 from Config.Config import Config
 from .SpineMeasurer import SpineMeasurer
@@ -35,6 +40,66 @@ except ImportError as e:
     logger.warning(f"SegmentationRefiner no disponible: {e}")
     REFINER_AVAILABLE = False
 
+# cv2.hasNonZero (OpenCV >= 4.9) se detiene en el primer píxel encendido;
+# en versiones anteriores se recurre a countNonZero
+_has_nonzero = getattr(cv2, "hasNonZero", None) or (lambda mask: cv2.countNonZero(mask) > 0)
+
+# ============================================================================
+# CLIENTE HTTP PERSISTENTE PARA MOONDREAM
+# ============================================================================
+class _PooledMoondreamClient:
+    """
+    Envoltura del cliente oficial que envía `detect` por una sesión HTTP
+    persistente: el cliente de la librería abre una conexión TLS nueva
+    (urllib) en cada llamada. Reutiliza su codificación, endpoint y API key.
+
+    Reproduce el formato de `CloudVL.detect` de moondream==0.2.0 (ruta
+    `/detect`, cabeceras y payload JSON) y lee atributos no documentados del
+    cliente (`endpoint`, `api_key`, `encode_image`). Solo se usa con esa
+    versión exacta (ver `supported()`); con cualquier otra se usa el cliente de
+    la librería tal cual. tests/test_moondream_client.py compara ambas peticiones.
+
+    La sesión se comparte entre los hilos del pool de detección: tras
+    `__init__` solo se lee su configuración, el pool de conexiones de urllib3
+    es thread-safe y el CookieJar de requests lleva su propio lock.
+    """
+
+    SUPPORTED_VERSION = "0.2.0"
+    TIMEOUT_S = 30
+
+    @classmethod
+    def supported(cls) -> bool:
+        """True si la versión instalada de moondream es la verificada."""
+        try:
+            return importlib.metadata.version("moondream") == cls.SUPPORTED_VERSION
+        except importlib.metadata.PackageNotFoundError:
+            return False
+
+    def __init__(self, client: Any):
+        self._client = client
+        self._session = requests.Session()
+        self._session.headers.update({
+            "Content-Type": "application/json",
+            "User-Agent": f"moondream-python/{md_lib.__version__}",
+        })
+        if client.api_key:
+            self._session.headers["X-Moondream-Auth"] = client.api_key
+        # Un par de conexiones: una por hilo de detección en paralelo
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def detect(self, image: Any, object_name: str) -> Dict[str, Any]:
+        encoded_image = self._client.encode_image(image)
+        response = self._session.post(
+            f"{self._client.endpoint}/detect",
+            json={"image_url": encoded_image.image_url, "object": object_name},
+            timeout=self.TIMEOUT_S,
+        )
+        response.raise_for_status()
+        return {"objects": response.json()["objects"]}
+
+
 # ============================================================================
 # ESTRUCTURAS DE DATOS
 # ============================================================================
@@ -67,12 +132,38 @@ class AdvancedDetector:
     obtener un resultado válido.
     """
 
+    # Tabla de corrección gamma (0.8) para el filtro de enfoque; se calcula una sola vez
+    _GAMMA = 0.8
+    _GAMMA_LUT = (((np.arange(256) / 255.0) ** (1.0 / _GAMMA)) * 255).astype(np.uint8)
+    # Lado máximo enviado a Moondream; la API responde en coordenadas normalizadas
+    _MOONDREAM_MAX_SIDE = 512
+    _MOONDREAM_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85]
+    # Margen (px) alrededor de la caja que GrabCut usa como muestra de fondo
+    _GRABCUT_ROI_MARGIN = 60
+    # Elemento estructurante del núcleo seguro de GrabCut (constante entre frames)
+    _CORE_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
+    # Tablas de traducción máscara binaria <-> estados de GrabCut (una pasada cada una)
+    _GC_LUT = np.full(256, cv2.GC_PR_FGD, np.uint8)
+    _GC_LUT[0] = cv2.GC_PR_BGD
+    _GC_FG_LUT = np.zeros(256, np.uint8)
+    _GC_FG_LUT[[cv2.GC_FGD, cv2.GC_PR_FGD]] = 255
+
     def __init__(self, api_key: Optional[str] = None):
         self.is_ready = False
-        self.detectors_chain: List[Dict[str, Any]] = []
+        # (nombre, método) ya enlazados: el bucle de detección no consulta diccionarios
+        self.detectors_chain: List[Tuple[str, Callable[[np.ndarray], Optional[Tuple[int, int, int, int]]]]] = []
         self.refiner: Optional[SegmentationRefiner] = None
         self.api_model = None
 
+        # CLAHE reutilizable; el lock evita aplicarlo desde dos hilos a la vez
+        # (FrameProcessor y la captura manual comparten este detector)
+        self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        self._clahe_lock = threading.Lock()
+
+        # Hilos para adelantar detecciones (latencia de red de Moondream)
+        # mientras el hilo llamador ejecuta SAM/GrabCut de otra vista
+        self._api_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="moondream")
+
         self.api_key = api_key if api_key else getattr(Config, 'MOONDREAM_API_KEY', '')
 
         self._init_system()
@@ -113,41 +204,48 @@ class AdvancedDetector:
             return None
             
         try:
-            return md_lib.vl(api_key=self.api_key)
+            client = md_lib.vl(api_key=self.api_key)
+            if not _PooledMoondreamClient.supported():
+                logger.warning(
+                    "Version de moondream no verificada para conexiones persistentes; "
+                    "se usa el cliente de la libreria."
+                )
+                return client
+            return _PooledMoondreamClient(client)
         except Exception as e:
             logger.error(f"Excepcion al conectar con Moondream: {e}")
             return None
-    def _prepare_image_for_moondream(self, image_bgr: np.ndarray) -> Image:
+    def _prepare_image_for_moondream(self, image_bgr: np.ndarray) -> Base64EncodedImage:
         """
         Filtro de Enfoque: Suaviza el fondo y oscurece sombras para que Moondream vea solo al pez.
+        Retorna la imagen ya codificada en JPEG, lista para la API (sin paso por PIL).
         """
+        # 0. Reducción previa: el costo bilateral crece con el número de píxeles
+        h, w = image_bgr.shape[:2]
+        scale = self._MOONDREAM_MAX_SIDE / max(h, w)
+        if scale < 1.0:
+            image_bgr = cv2.resize(image_bgr, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
         # 1. Reducción de ruido bilateral (suaviza fondo sin borrar bordes del pez)
         smooth = cv2.bilateralFilter(image_bgr, 9, 75, 75)
         
         # 2. Ajuste de Gamma (oscurece el tanque para resaltar el brillo del pez)
-        gamma = 0.8
-        invGamma = 1.0 / gamma
-        table = np.array([((i / 255.0) ** invGamma) * 255 for i in np.arange(0, 256)]).astype("uint8")
-        focused_img = cv2.LUT(smooth, table)
+        # Se aplica en sitio sobre el buffer del filtro
+        cv2.LUT(smooth, self._GAMMA_LUT, dst=smooth)
         
-        # Convertir a PIL para la API
-        img_rgb = cv2.cvtColor(focused_img, cv2.COLOR_BGR2RGB)
-        return Image.fromarray(img_rgb)
+        # 3. Codificación única a JPEG (OpenCV codifica BGR directamente)
+        ok, jpeg = cv2.imencode(".jpg", smooth, self._MOONDREAM_JPEG_PARAMS)
+        if not ok:
+            raise ValueError("No se pudo codificar la imagen para Moondream.")
+        img_str = base64.b64encode(jpeg).decode("ascii")
+        return Base64EncodedImage(image_url=f"data:image/jpeg;base64,{img_str}")
     
     def _create_detection_chain(self) -> None:
         """Registra los métodos de detección disponibles en orden de prioridad."""
         if self.api_model:
-            self.detectors_chain.append({
-                "name": "Moondream API",
-                "method": self._detect_with_api,
-                "type": "remote"
-            })
-
-        self.detectors_chain.append({
-            "name": "Classic HSV Fallback",
-            "method": self._detect_with_classic_vision,
-            "type": "local"
-        })
+            self.detectors_chain.append(("Moondream API", self._detect_with_api))
+
+        self.detectors_chain.append(("Classic HSV Fallback", self._detect_with_classic_vision))
 
     def _detect_with_classic_vision(self, image_bgr: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
         """Fallback local sin nube basado en segmentación HSV del fondo y contorno del pez."""
@@ -156,10 +254,7 @@ class AdvancedDetector:
 
         try:
             hsv = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2HSV)
-            lower_bg = np.array([Config.HSV_H_MIN, Config.HSV_S_MIN, Config.HSV_V_MIN], dtype=np.uint8)
-            upper_bg = np.array([Config.HSV_H_MAX, Config.HSV_S_MAX, Config.HSV_V_MAX], dtype=np.uint8)
-
-            mask_bg = cv2.inRange(hsv, lower_bg, upper_bg)
+            mask_bg = cv2.inRange(hsv, Config.HSV_LOWER, Config.HSV_UPPER)
             mask_fish = cv2.bitwise_not(mask_bg)
 
             kernel = np.ones((5, 5), np.uint8)
@@ -200,36 +295,78 @@ class AdvancedDetector:
             logger.error("Intento de deteccion sin sistema inicializado.")
             return None
 
-        for detector in self.detectors_chain:
+        for name, method in self.detectors_chain:
             try:
-                box = detector["method"](image_bgr)
+                box = method(image_bgr)
                 if box:
                     return box
             except Exception as e:
-                logger.error(f"Fallo en detector {detector['name']}: {e}")
+                logger.error(f"Fallo en detector {name}: {e}")
                 continue
         
         
         return None
+
+    def detect_fish_async(self, image_bgr: np.ndarray) -> Future:
+        """
+        Lanza `detect_fish` en segundo plano y retorna el Future con la caja.
+        Permite solapar la llamada a la API con trabajo local sobre otra imagen.
+        """
+        return self._api_pool.submit(self.detect_fish, image_bgr)
+
+    def analyze_batch(self, frames: List[np.ndarray]) -> List[Optional[BiometryResult]]:
+        """
+        Analiza varias imágenes (p. ej. vista lateral y cenital) de una vez.
+        Todas las detecciones se lanzan a la API antes de empezar el trabajo
+        local, de modo que la segmentación de una vista solapa la latencia de red
+        de las demás. Devuelve los resultados en el mismo orden que `frames`.
+        """
+        detections = [self.detect_fish_async(frame) for frame in frames]
+        return [
+            self.analyze_frame(frame, detection=detection)
+            for frame, detection in zip(frames, detections)
+        ]
+
     def _apply_clahe(self, image_bgr: np.ndarray) -> np.ndarray:
         """Mejora el contraste local (LAB space) para ver a través de agua turbia."""
+        # Solo se extrae el canal L; el resto del trabajo reutiliza el buffer LAB
         lab = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        l = clahe.apply(l)
-        lab = cv2.merge((l, a, b))
-        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-
-    def _refine_mask_with_grabcut(self, image_bgr: np.ndarray, mask: np.ndarray) -> np.ndarray:
-        """Ajusta los bordes de la máscara SAM exactamente a las escamas del pez."""
-        if mask is None or np.sum(mask) == 0:
+        l = cv2.extractChannel(lab, 0)
+        with self._clahe_lock:
+            self._clahe.apply(l, dst=l)
+        cv2.insertChannel(l, lab, 0)
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR, dst=lab)
+
+    def _refine_mask_with_grabcut(
+        self,
+        image_bgr: np.ndarray,
+        mask: np.ndarray,
+        box: Optional[Tuple[int, int, int, int]] = None
+    ) -> np.ndarray:
+        """
+        Ajusta los bordes de la máscara SAM exactamente a las escamas del pez.
+        Con `box`, GrabCut solo procesa la caja (más un margen) y el resto de la
+        máscara se conserva tal cual.
+        """
+        if mask is None or not _has_nonzero(mask):
             return mask
+
+        if box is not None:
+            h_m, w_m = mask.shape[:2]
+            x1, y1, x2, y2 = box
+            margin = self._GRABCUT_ROI_MARGIN
+            roi = (
+                slice(max(0, y1 - margin), min(h_m, y2 + margin)),
+                slice(max(0, x1 - margin), min(w_m, x2 + margin)),
+            )
+            refined = mask.copy()
+            refined[roi] = self._refine_mask_with_grabcut(image_bgr[roi], mask[roi])
+            return refined
         
         # Crear máscara de estados para GrabCut
-        gc_mask = np.where(mask > 0, cv2.GC_PR_FGD, cv2.GC_PR_BGD).astype('uint8')
+        gc_mask = cv2.LUT(mask, self._GC_LUT)
         
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
-        inner_core = cv2.erode(mask, kernel, iterations=2)
+        inner_core = cv2.erode(mask, self._CORE_KERNEL, iterations=2)
         gc_mask[inner_core > 0] = cv2.GC_FGD
         
         bgd_model = np.zeros((1, 65), np.float64)
@@ -237,13 +374,17 @@ class AdvancedDetector:
         
         try:
             cv2.grabCut(image_bgr, gc_mask, None, bgd_model, fgd_model, 2, cv2.GC_INIT_WITH_MASK)
-            refined_mask = np.where((gc_mask == cv2.GC_FGD) | (gc_mask == cv2.GC_PR_FGD), 255, 0).astype('uint8')
+            refined_mask = cv2.LUT(gc_mask, self._GC_FG_LUT)
             return refined_mask
         except Exception as e:
             logger.debug(f"GrabCut falló, usando máscara original: {e}")
             return mask
 
-    def analyze_frame(self, image_bgr: np.ndarray) -> Optional[BiometryResult]:
+    def analyze_frame(
+        self,
+        image_bgr: np.ndarray,
+        detection: Optional[Future] = None
+    ) -> Optional[BiometryResult]:
         """
         FLUJO DE PRECISIÓN TOTAL:
         1. Detección con Imagen Enfocada (Moondream).
@@ -251,52 +392,72 @@ class AdvancedDetector:
         3. Refinamiento de Bordes (GrabCut).
         4. Suavizado Sub-píxel.
         5. Esqueleto Blindado.
+
+        `detection` admite un Future de `detect_fish_async` ya lanzado para
+        esta misma imagen; si se omite, la detección se hace aquí mismo.
         """
         # --- PASO 1: DETECCIÓN (USANDO EL FILTRO DE ENFOQUE) ---
         # No enviamos la imagen cruda, enviamos la imagen con Gamma corregido
-        raw_box = self.detect_fish(image_bgr)
+        if detection is not None:
+            raw_box = detection.result()
+        else:
+            raw_box = self.detect_fish(image_bgr)
         
         if raw_box is None:
             return None
 
-        # --- PASO 2: MEJORA DE IMAGEN PARA GEOMETRÍA ---
-        processed_img = self._apply_clahe(image_bgr)
         result = BiometryResult(bbox=raw_box, source="hybrid_precision_v3")
 
         if not self.refiner:
             return result
 
+        # --- PASO 2: MEJORA DE IMAGEN PARA GEOMETRÍA ---
+        # Solo la consumen SAM y GrabCut; sin refinador no se calcula
+        processed_img = self._apply_clahe(image_bgr)
+
         try:
             # 2. Segmentación (Refinamiento con SAM)
             mask = self.refiner.get_body_mask(processed_img, list(raw_box))
             
-            if mask is None or cv2.countNonZero(mask) == 0:
+            if mask is None or not _has_nonzero(mask):
                 return result
 
-            mask = self._refine_mask_with_grabcut(processed_img, mask)
+            mask = self._refine_mask_with_grabcut(processed_img, mask, raw_box)
 
             # === NUEVO: BLOQUEO ESTRICTO DE CAJA ===
-            # Creamos una jaula negra del tamaño de la imagen
-            h_m, w_m = mask.shape[:2]
-            strict_box_mask = np.zeros((h_m, w_m), dtype=np.uint8)
+            # Solo permitimos blanco DENTRO de la caja de Moondream: se apagan
+            # en sitio las cuatro franjas exteriores, sin una segunda máscara
             x1, y1, x2, y2 = raw_box
-            # Solo permitimos blanco DENTRO de la caja de Moondream
-            strict_box_mask[y1:y2, x1:x2] = 255
-            mask = cv2.bitwise_and(mask, strict_box_mask)
+            mask[:y1] = 0
+            mask[y2:] = 0
+            mask[:, :x1] = 0
+            mask[:, x2:] = 0
             # =======================================
 
             result.mask = mask
 
             # --- PASO 6: EXTRACCIÓN DE CONTORNOS ---
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            if not contours:
+            # Fuera de la caja la máscara ya es negra: se busca solo dentro de ella.
+            # Área y caja de cada componente salen de una sola pasada en C
+            n_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
+                mask[y1:y2, x1:x2], connectivity=8
+            )
+            if n_labels < 2:
                 return result
-            
-            largest_contour = max(contours, key=cv2.contourArea)
-            result.contour = largest_contour
-            
+
+            largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+            x, y, w, h = (int(v) for v in stats[largest, :cv2.CC_STAT_AREA])
+
+            # El contorno se traza solo sobre la caja del componente ganador
+            component = (labels[y:y + h, x:x + w] == largest).astype(np.uint8)
+            x += x1
+            y += y1
+            contours, _ = cv2.findContours(
+                component, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x, y)
+            )
+            result.contour = contours[0]
+
             # Recalcular caja final sobre la máscara perfecta
-            x, y, w, h = cv2.boundingRect(largest_contour)
             result.bbox = (x, y, x + w, y + h)
 
             # --- PASO 7: COLUMNA (SPINE) ---
@@ -323,10 +484,10 @@ class AdvancedDetector:
             h_img, w_img = image_bgr.shape[:2]
             
             # LLAMADA AL FILTRO DE ENFOQUE ANTES DE ENVIAR A MOONDREAM
-            pil_image = self._prepare_image_for_moondream(image_bgr)
+            encoded_image = self._prepare_image_for_moondream(image_bgr)
             
             prompt = "detect a fish body side view suitable for measurement"
-            result = self.api_model.detect(pil_image, prompt)
+            result = self.api_model.detect(encoded_image, prompt)
             
             if result and result.get("objects"):
                 obj = result["objects"][0]
@@ -5,6 +5,8 @@ FishTrace - Interconectividad API
 
 import threading
 import sqlite3
+import os
+from pathlib import Path
 import logging
 import time
 import requests
@@ -15,6 +17,7 @@ from flask_cors import CORS
 from pyngrok import ngrok, conf
 
 from Config.Config import Config
+from BasedeDatos.DatabaseManager import CONNECTION_PRAGMAS, STATEMENT_CACHE_SIZE
 from Herramientas.SensorService import SensorService
 
 
@@ -27,6 +30,59 @@ logger = logging.getLogger(__name__)
 logging.getLogger("werkzeug").setLevel(logging.WARNING)
 
 
+# ================= DATABASE =================
+# La API solo lee: el modo de journal (escritura en el fichero) lo fija
+# DatabaseManager, dueño del esquema; aquí se aplican solo los PRAGMAs de conexión.
+_READ_PRAGMAS = tuple(p for p in CONNECTION_PRAGMAS if "journal_mode" not in p)
+
+
+# ================= CACHE =================
+# Tope de respuestas cacheadas: la API se publica por ngrok y el cliente
+# controla los parámetros, así que la caché no puede crecer sin límite.
+CACHE_MAX_ENTRIES = 64
+
+
+# ================= SQL =================
+# Reporte del último día en una sola sentencia: el CTE obtiene el rango de
+# fechas con medición válida (su máximo es el último día) y el agregado se
+# calcula sobre ese día. El texto es constante por alcance (todas las tandas
+# o una tanda), así la caché de sentencias de sqlite3 reutiliza el plan.
+_LAST_REPORT_SQL_TEMPLATE = """
+    WITH rango AS (
+        SELECT MIN(substr(timestamp, 1, 10)) AS primera,
+               MAX(substr(timestamp, 1, 10)) AS ultima
+        FROM measurements
+        WHERE (length_cm > 0 OR manual_length_cm > 0)
+          AND {scope}
+    )
+    SELECT
+        rango.primera AS primera,
+        rango.ultima AS ultima,
+        rango.ultima AS fecha,
+        COUNT(m.timestamp) as total_muestras,
+        ROUND(AVG(CASE WHEN manual_length_cm > 0 THEN manual_length_cm ELSE length_cm END), 2) as longitud_cm,
+        ROUND(AVG(CASE WHEN manual_weight_g > 0 THEN manual_weight_g ELSE weight_g END), 2) as peso_g,
+        ROUND(AVG(CASE WHEN manual_height_cm > 0 THEN manual_height_cm ELSE height_cm END), 2) as alto_cm,
+        ROUND(AVG(CASE WHEN manual_width_cm > 0 THEN manual_width_cm ELSE width_cm END), 2) as ancho_cm,
+        ROUND(AVG(lat_area_cm2), 2) as area_lateral_cm2,
+        ROUND(AVG(top_area_cm2), 2) as area_cenital_cm2,
+        ROUND(AVG(volume_cm3), 2) as volumen_cm3,
+        ROUND(AVG(CASE WHEN api_air_temp_c > 0 THEN api_air_temp_c ELSE NULL END), 1) as temp_aire_c,
+        ROUND(AVG(CASE WHEN api_water_temp_c > 0 THEN api_water_temp_c ELSE NULL END), 1) as temp_agua_c,
+        ROUND(AVG(CASE WHEN api_ph > 0 THEN api_ph ELSE NULL END), 1) as ph,
+        ROUND(AVG(CASE WHEN api_do_mg_l > 0 THEN api_do_mg_l ELSE NULL END), 1) as oxigeno_mg_l,
+        ROUND(AVG(CASE WHEN api_rel_humidity > 0 THEN api_rel_humidity ELSE NULL END), 1) as humedad_rel,
+        ROUND(AVG(CASE WHEN api_turbidity_ntu > 0 THEN api_turbidity_ntu ELSE NULL END), 1) as turbidez_ntu,
+        ROUND(AVG(CASE WHEN api_cond_us_cm > 0 THEN api_cond_us_cm ELSE NULL END), 1) as conductividad_us
+    FROM rango
+    LEFT JOIN measurements m
+        ON substr(m.timestamp, 1, 10) = rango.ultima
+       AND {scope}
+"""
+_LAST_REPORT_SQL = _LAST_REPORT_SQL_TEMPLATE.format(scope="1=1")
+_LAST_REPORT_BATCH_SQL = _LAST_REPORT_SQL_TEMPLATE.format(scope="COALESCE(batch_id, '') = ?")
+
+
 class ApiService:
 
     # ================= INIT =================
@@ -48,6 +104,13 @@ class ApiService:
         self.sensor_thread = None
 
         self._cache = {}
+        self._cache_lock = threading.Lock()
+
+        # Conexión SQLite de solo lectura reutilizada por todas las rutas.
+        # Flask (threaded=True) crea un hilo por petición, así que una conexión
+        # por hilo no se reutilizaría: se comparte una sola, serializada por lock.
+        self._db_conn = None
+        self._db_lock = threading.Lock()
         self._live_sensors = {}          # ← Variables ambientales en vivo
         self._live_sensors_lock = threading.Lock()
 
@@ -65,6 +128,38 @@ class ApiService:
         return self.public_url
 
 
+    # ================= DATABASE =================
+    def _get_conn(self):
+        """Retorna la conexión persistente de solo lectura (URI `mode=ro`),
+        abriéndola en el primer uso. Debe llamarse con `_db_lock` tomado."""
+        if self._db_conn is None:
+            conn = sqlite3.connect(
+                Path(os.path.abspath(Config.DB_NAME)).as_uri() + "?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=STATEMENT_CACHE_SIZE,
+            )
+            conn.row_factory = sqlite3.Row
+            for pragma in _READ_PRAGMAS:
+                try:
+                    conn.execute(pragma)
+                except sqlite3.OperationalError as e:
+                    logger.warning(f"No se pudo aplicar '{pragma}': {e}")
+            self._db_conn = conn
+        return self._db_conn
+
+    def _close_conn(self):
+        """Cierra la conexión persistente si estaba abierta."""
+        with self._db_lock:
+            if self._db_conn is not None:
+                try:
+                    self._db_conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"Error cerrando conexion SQLite: {e}")
+                self._db_conn = None
+
+
     # ================= SENSOR POLLING =================
     def _poll_sensors(self):
         """Actualiza variables ambientales desde el WOC cada 1 segundo."""
@@ -79,6 +174,19 @@ class ApiService:
             time.sleep(1)
 
 
+    # ================= CACHE =================
+    def _cache_store(self, key, entry, now):
+        """Inserta en la caché de respuestas sin dejarla crecer sin límite.
+        El último campo de cada entrada es su instante de expiración.
+        Se llama con `_cache_lock` tomado."""
+        for old_key in [k for k, v in self._cache.items() if v[-1] <= now]:
+            del self._cache[old_key]
+        # El dict conserva el orden de inserción: el primero es el más antiguo
+        self._cache.pop(key, None)
+        while len(self._cache) >= CACHE_MAX_ENTRIES:
+            del self._cache[next(iter(self._cache))]
+        self._cache[key] = entry
+
     # ================= ROUTES =================
     def _setup_routes(self):
 
@@ -102,21 +210,35 @@ class ApiService:
             value = str(value or '').strip()
             return value or None
 
-        def cached(timeout=60):
+        def cached(timeout=60, key_args=("batch_id",)):
+            """Cachea respuestas 200 guardando el cuerpo ya serializado: un acierto
+            no vuelve a pasar por JSON. La clave usa solo los parámetros de
+            `key_args` (los que la ruta lee), no la URL completa del cliente, y la
+            caché se poda al insertar: expiradas primero y luego las más antiguas
+            hasta CACHE_MAX_ENTRIES."""
             def decorator(f):
                 @wraps(f)
                 def wrapper(*args, **kwargs):
-                    now = time.time()
-                    key = f.__name__
-
-                    if key in self._cache:
-                        data, ts = self._cache[key]
-                        if now - ts < timeout:
-                            return data
-
-                    result = f(*args, **kwargs)
-                    self._cache[key] = (result, now)
-                    return result
+                    now = time.monotonic()
+                    key = (f.__name__,) + tuple(
+                        request.args.get(name, type=str) for name in key_args
+                    )
+
+                    with self._cache_lock:
+                        entry = self._cache.get(key)
+                    if entry is not None:
+                        body, status, mimetype, expires = entry
+                        if now < expires:
+                            return self.app.response_class(body, status=status, mimetype=mimetype)
+
+                    response = self.app.make_response(f(*args, **kwargs))
+                    if response.status_code == 200:
+                        with self._cache_lock:
+                            self._cache_store(key, (
+                                response.get_data(), response.status_code, response.mimetype,
+                                now + timeout
+                            ), now)
+                    return response
                 return wrapper
             return decorator
 
@@ -124,8 +246,8 @@ class ApiService:
         @self.app.route('/api/health', methods=['GET'])
         def health_check():
             try:
-                with sqlite3.connect(Config.DB_NAME) as conn:
-                    cursor = conn.cursor()
+                with self._db_lock:
+                    cursor = self._get_conn().cursor()
                     cursor.execute("SELECT COUNT(*) FROM measurements")
                     count = cursor.fetchone()[0]
 
@@ -152,72 +274,23 @@ class ApiService:
         @self.app.route('/api/last_report', methods=['GET'])
         def get_last_report():
             try:
-                with sqlite3.connect(Config.DB_NAME) as conn:
-                    conn.row_factory = sqlite3.Row
-                    cursor = conn.cursor()
+                with self._db_lock:
+                    cursor = self._get_conn().cursor()
 
                     requested_batch = request.args.get('batch_id', type=str)
                     target_batch = resolve_target_batch(cursor, requested_batch)
                     if target_batch:
-                        scope_filter = "COALESCE(batch_id, '') = ?"
-                        scope_params = [target_batch]
+                        cursor.execute(_LAST_REPORT_BATCH_SQL, (target_batch, target_batch))
                     else:
-                        scope_filter = "1=1"
-                        scope_params = []
-
-                    query_last_day = f"""
-                        SELECT substr(timestamp, 1, 10) as f
-                        FROM measurements
-                        WHERE (length_cm > 0 OR manual_length_cm > 0)
-                          AND {scope_filter}
-                        ORDER BY timestamp DESC LIMIT 1
-                    """
-                    cursor.execute(query_last_day, tuple(scope_params))
-                    res = cursor.fetchone()
-
-                    if not res:
-                        return jsonify({
-                            "success": False,
-                            "error": "No hay mediciones registradas",
-                            "data": None
-                        }), 404
-
-                    ultima_fecha = res['f']
-
-                    query = f"""
-                        SELECT 
-                            substr(timestamp, 1, 10) as fecha,
-                            COUNT(*) as total_muestras,
-                            ROUND(AVG(CASE WHEN manual_length_cm > 0 THEN manual_length_cm ELSE length_cm END), 2) as longitud_cm,
-                            ROUND(AVG(CASE WHEN manual_weight_g > 0 THEN manual_weight_g ELSE weight_g END), 2) as peso_g,
-                            ROUND(AVG(CASE WHEN manual_height_cm > 0 THEN manual_height_cm ELSE height_cm END), 2) as alto_cm,
-                            ROUND(AVG(CASE WHEN manual_width_cm > 0 THEN manual_width_cm ELSE width_cm END), 2) as ancho_cm,
-                            ROUND(AVG(lat_area_cm2), 2) as area_lateral_cm2,
-                            ROUND(AVG(top_area_cm2), 2) as area_cenital_cm2,
-                            ROUND(AVG(volume_cm3), 2) as volumen_cm3,
-                            ROUND(AVG(CASE WHEN api_air_temp_c > 0 THEN api_air_temp_c ELSE NULL END), 1) as temp_aire_c,
-                            ROUND(AVG(CASE WHEN api_water_temp_c > 0 THEN api_water_temp_c ELSE NULL END), 1) as temp_agua_c,
-                            ROUND(AVG(CASE WHEN api_ph > 0 THEN api_ph ELSE NULL END), 1) as ph,
-                            ROUND(AVG(CASE WHEN api_do_mg_l > 0 THEN api_do_mg_l ELSE NULL END), 1) as oxigeno_mg_l,
-                            ROUND(AVG(CASE WHEN api_rel_humidity > 0 THEN api_rel_humidity ELSE NULL END), 1) as humedad_rel,
-                            ROUND(AVG(CASE WHEN api_turbidity_ntu > 0 THEN api_turbidity_ntu ELSE NULL END), 1) as turbidez_ntu,
-                            ROUND(AVG(CASE WHEN api_cond_us_cm > 0 THEN api_cond_us_cm ELSE NULL END), 1) as conductividad_us
-                        FROM measurements
-                        WHERE substr(timestamp, 1, 10) = ?
-                          AND {scope_filter}
-                    """
-                    cursor.execute(query, tuple([ultima_fecha] + scope_params))
+                        cursor.execute(_LAST_REPORT_SQL)
                     reporte = cursor.fetchone()
 
-                    query_range = f"""
-                        SELECT MIN(substr(timestamp, 1, 10)) AS primera,
-                               MAX(substr(timestamp, 1, 10)) AS ultima
-                        FROM measurements
-                        WHERE (length_cm > 0 OR manual_length_cm > 0)
-                          AND {scope_filter}
-                    """
-                    cursor.execute(query_range, tuple(scope_params))
-                    rango = cursor.fetchone()
+                if reporte is None or reporte["ultima"] is None:
+                    return jsonify({
+                        "success": False,
+                        "error": "No hay mediciones registradas",
+                        "data": None
+                    }), 404
 
                 # ← Snapshot seguro de los sensores en vivo
                 with self._live_sensors_lock:
@@ -227,8 +300,8 @@ class ApiService:
                     "fecha": reporte["fecha"],
                     "total_muestras": reporte["total_muestras"],
                     "batch_id": target_batch,
-                    "primera_medicion_tanda": rango["primera"] if rango else None,
-                    "ultima_medicion_tanda": rango["ultima"] if rango else None,
+                    "primera_medicion_tanda": reporte["primera"],
+                    "ultima_medicion_tanda": reporte["ultima"],
 
                     "biometria": {
                         "longitud_cm": reporte["longitud_cm"],
@@ -278,9 +351,8 @@ class ApiService:
         @self.app.route('/api/stats', methods=['GET'])
         def get_statistics():
             try:
-                with sqlite3.connect(Config.DB_NAME) as conn:
-                    conn.row_factory = sqlite3.Row
-                    cursor = conn.cursor()
+                with self._db_lock:
+                    cursor = self._get_conn().cursor()
 
                     requested_batch = request.args.get('batch_id', type=str)
                     target_batch = resolve_target_batch(cursor, requested_batch)
@@ -452,6 +524,7 @@ class ApiService:
             ngrok.kill()
         except:
             pass
+        self._close_conn()
 
 
     # ================= STATUS =================
@@ -25,6 +25,8 @@ class BiometryService:
     Encapsula toda la complejidad del análisis de estereovisión.
     """
 
+    _SKEL_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
     def __init__(self, advanced_detector):
         self.detector = advanced_detector
 
@@ -58,8 +60,8 @@ class BiometryService:
             # ============================================================
             # FASE 1: DETECCIÓN Y SEGMENTACIÓN (Deep Learning)
             # ============================================================
-            res_lat = self.detector.analyze_frame(img_lat)
-            res_top = self.detector.analyze_frame(img_top)
+            # Ambas detecciones viajan a la API antes de segmentar cualquier vista
+            res_lat, res_top = self.detector.analyze_batch([img_lat, img_top])
 
             if not res_lat or not res_lat.bbox:
                 logger.warning("No se detecto pez en vista lateral.")
@@ -207,7 +209,7 @@ class BiometryService:
             # ============================================================
             img_lat_ann = self._draw_result(img_lat, res_lat, (0, 0, 255), "LAT", draw_box, draw_skeleton)
             
-            img_top_ann = img_top.copy()
+            img_top_ann = img_top
             if has_top:
                 img_top_ann = self._draw_result(img_top, res_top, (0, 0, 255), "TOP", draw_box, draw_skeleton)
             
@@ -224,20 +226,32 @@ class BiometryService:
         """
         if result is None or image is None: 
             return image
-        
+
+        h, w = image.shape[:2]
+        has_contour = result.contour is not None
+        has_box = bool(show_box and result.bbox)
+        has_skel = (
+            show_skel
+            and result.spine_visualization is not None
+            and result.spine_visualization.shape[:2] == (h, w)
+        )
+
+        # Sin nada que dibujar se devuelve la imagen tal cual (sin copia completa)
+        if not (has_contour or has_box or has_skel):
+            return image
+
         vis = image.copy()
-        h, w = vis.shape[:2]
         
         # Factores dinámicos
         thickness = max(2, int(w / 600))
         font_scale = max(0.6, w / 1200)
 
         # 1. Contorno 
-        if result.contour is not None:
+        if has_contour:
             cv2.drawContours(vis, [result.contour], -1, color, 2)
 
         # 2. Caja 
-        if show_box and result.bbox:
+        if has_box:
             x1, y1, x2, y2 = result.bbox
             cv2.rectangle(vis, (x1, y1), (x2, y2), color, thickness)
             
@@ -248,18 +262,24 @@ class BiometryService:
             cv2.putText(vis, txt, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255,255,255), thickness)
 
         # 3. Esqueleto 
-        if show_skel and result.spine_visualization is not None:
+        if has_skel:
             skel_mask = result.spine_visualization
 
-            if skel_mask.shape[:2] == (h, w):
-
-                kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-                skel_dilated = cv2.dilate(skel_mask, kernel, iterations=1)
-                vis[skel_dilated > 0] = (0, 0, 255) # Rojo
-
-                if result.spine_length > 0:
-                    info_txt = f"Skel: {int(result.spine_length)}px"
-                    cv2.putText(vis, info_txt, (20, h - 20), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0,0,255), thickness)
+            # Solo se dilata y pinta el rectángulo que contiene el esqueleto
+            # (+1 px por el kernel), con copia enmascarada de OpenCV
+            sx, sy, sw, sh = cv2.boundingRect(skel_mask)
+            if sw > 0 and sh > 0:
+                x0, y0 = max(sx - 1, 0), max(sy - 1, 0)
+                x1, y1 = min(sx + sw + 1, w), min(sy + sh + 1, h)
+                skel_dilated = cv2.dilate(skel_mask[y0:y1, x0:x1], self._SKEL_KERNEL, iterations=1)
+                roi = vis[y0:y1, x0:x1]
+                red = np.empty_like(roi)
+                red[:] = (0, 0, 255) # Rojo
+                cv2.copyTo(red, skel_dilated, roi)
+
+            if result.spine_length > 0:
+                info_txt = f"Skel: {int(result.spine_length)}px"
+                cv2.putText(vis, info_txt, (20, h - 20), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0,0,255), thickness)
 
         return vis
 
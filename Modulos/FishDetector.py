@@ -180,9 +180,7 @@ class FishDetector:
         """Pipeline original de CPU como respaldo"""
         hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
         
-        lower_green = np.array([Config.HSV_H_MIN, Config.HSV_S_MIN, Config.HSV_V_MIN])
-        upper_green = np.array([Config.HSV_H_MAX, Config.HSV_S_MAX, Config.HSV_V_MAX])
-        mask_green = cv2.inRange(hsv, lower_green, upper_green)
+        mask_green = cv2.inRange(hsv, Config.HSV_LOWER, Config.HSV_UPPER)
         
         mask_fish = cv2.bitwise_not(mask_green)
         
@@ -234,4 +232,6 @@ class FishDetector:
         Config.HSV_S_MIN = s_min
         Config.HSV_S_MAX = s_max
         Config.HSV_V_MIN = v_min
-        Config.HSV_V_MAX = v_max
\ No newline at end of file
+        Config.HSV_V_MAX = v_max
+        Config.HSV_LOWER = np.array([h_min, s_min, v_min], dtype=np.uint8)
+        Config.HSV_UPPER = np.array([h_max, s_max, v_max], dtype=np.uint8)
\ No newline at end of file
@@ -22,6 +22,7 @@ import platform
 import subprocess
 import urllib.request
 from collections import deque
+from math import hypot
 from datetime import datetime, timedelta
 import numpy as np
 import cv2
@@ -86,7 +87,7 @@ from .OptimizedCamera import OptimizedCamera
 from .ApiService import ApiService
 from Herramientas.mobil import (
     start_flask_server,
-    mobile_capture_queue,
+    pop_mobile_capture,
     get_local_ip,
     build_mobile_access_url,
 )
@@ -2372,10 +2373,10 @@ class MainWindow(QMainWindow):
 
         def check_mobile_capture():
             """Verifica si llegó una captura desde el móvil."""
-            if not mobile_capture_queue.empty():
+            paquete = pop_mobile_capture()
+            if paquete is not None:
                 try:
                     # Obtener ruta de la imagen
-                    paquete = mobile_capture_queue.get(block=False)
                     image_path = paquete.get("path")
                     medidas_recibidas = paquete.get("medidas")
                     request_id = paquete.get("request_id", "sin-id")
@@ -7206,7 +7207,7 @@ QPushButton[class="info"] {{
                 x2, y2 = state['points'][1]
                 cv2.circle(draw, (x2, y2), 7, (0, 255, 255), -1)
                 cv2.line(draw, (x1, y1), (x2, y2), (255, 255, 0), 2)
-                px_dist = float(np.hypot(x2 - x1, y2 - y1))
+                px_dist = hypot(x2 - x1, y2 - y1)
                 cv2.putText(draw, f"px: {px_dist:.2f}", (15, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
 
             rgb = cv2.cvtColor(draw, cv2.COLOR_BGR2RGB)
@@ -7260,7 +7261,7 @@ QPushButton[class="info"] {{
 
             if len(state['points']) == 2:
                 (x1, y1), (x2, y2) = state['points']
-                px_dist = float(np.hypot(x2 - x1, y2 - y1))
+                px_dist = hypot(x2 - x1, y2 - y1)
                 if px_dist <= 0:
                     state['scale'] = None
                     lbl_result.setText("Escala calculada: error (distancia en px inválida)")
@@ -7280,12 +7281,12 @@ QPushButton[class="info"] {{
                 QMessageBox.warning(dialog, "Sin señal", "La cámara seleccionada no está disponible.")
                 return
 
-            ret, frame = cap.read()
+            ret, frame = cap.read(timeout=1.0)
             if not ret or frame is None:
                 QMessageBox.warning(dialog, "Sin frame", "No fue posible capturar imagen de la cámara seleccionada.")
                 return
 
-            state['frame'] = frame.copy()
+            state['frame'] = frame
             state['points'] = []
             state['scale'] = None
             lbl_result.setText("Escala calculada: -")
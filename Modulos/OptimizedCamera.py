@@ -8,6 +8,7 @@ DESCRIPCIÓN: Wrapper multihilo para OpenCV VideoCapture. Implementa el patrón
 
 import cv2
 import threading
+import time
 
 from Config.Config import Config
 
@@ -30,6 +31,7 @@ class OptimizedCamera:
                 
         self.latest_frame = None
         self.lock = threading.Lock()
+        self.frame_ready = threading.Event()
         self.running = False
         self.thread = None
         
@@ -47,9 +49,18 @@ class OptimizedCamera:
             if ret:
                 with self.lock:
                     self.latest_frame = frame
+                self.frame_ready.set()
+            else:
+                # Evita un bucle activo si el driver deja de entregar frames
+                time.sleep(0.01)
     
-    def read(self):
-        """Obtiene el frame más reciente (thread-safe)"""
+    def read(self, timeout=None):
+        """
+        Obtiene el frame más reciente (thread-safe).
+        Con timeout, espera hasta ese tiempo (s) a que llegue el primer frame.
+        """
+        if timeout and not self.frame_ready.is_set():
+            self.frame_ready.wait(timeout)
         with self.lock:
             if self.latest_frame is not None:
                 return True, self.latest_frame.copy()
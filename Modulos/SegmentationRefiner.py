@@ -9,7 +9,9 @@ DESCRIPCIÓN: Implementa el modelo 'Segment Anything Model' (Meta AI) para conve
 import cv2
 import numpy as np
 import logging
+import threading
 import torch
+import torch.nn.functional as F
 import gc
 from typing import Optional, List
 from ultralytics import SAM
@@ -20,7 +22,11 @@ class SegmentationRefiner:
     """
     Refinador de siluetas de alta precisión basado en SAM (Segment Anything Model).
     """
-    
+
+    # Modelos SAM compartidos entre instancias (nombre -> modelo ya calentado)
+    _shared_models = {}
+    _models_lock = threading.Lock()
+
     def __init__(self):
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.model = None
@@ -39,14 +45,27 @@ class SegmentationRefiner:
             self.model_name = "mobile_sam.pt"
 
         try:
-            self.model = SAM(self.model_name)
-            if self.device == 'cuda':
-                dummy_img = np.zeros((640, 640, 3), dtype=np.uint8)
-                self.model.predict(source=dummy_img, verbose=False)
+            self.model = self._get_shared_model(self.model_name, self.device)
         except Exception as e:
             logger.error("Error critico cargando SAM.", exc_info=True)
             self.model = None
 
+    @classmethod
+    def _get_shared_model(cls, model_name: str, device: str):
+        """
+        Carga los pesos una sola vez por proceso y los reutiliza en nuevas
+        instancias; el calentamiento en GPU también ocurre una única vez.
+        """
+        with cls._models_lock:
+            model = cls._shared_models.get(model_name)
+            if model is None:
+                model = SAM(model_name)
+                if device == 'cuda':
+                    dummy_img = np.zeros((640, 640, 3), dtype=np.uint8)
+                    model.predict(source=dummy_img, verbose=False)
+                cls._shared_models[model_name] = model
+            return model
+
     def get_body_mask(self, image_bgr: np.ndarray, box: List[int]) -> Optional[np.ndarray]:
         """
         Segmenta el pez y limpia aletas/ruido SIN reducir el tamaño del cuerpo.
@@ -71,13 +90,17 @@ class SegmentationRefiner:
             if not results or results[0].masks is None:
                 return None
 
-            mask_raw = results[0].masks.data[0].cpu().numpy()
-            
+            # Escalado y binarizado sobre el tensor en su dispositivo; solo se
+            # transfiere a CPU la máscara final en uint8 (1/4 de bytes vs float32)
             h_img, w_img = image_bgr.shape[:2]
-            mask_uint8 = (mask_raw * 255).astype(np.uint8)
-            
-            if mask_uint8.shape[:2] != (h_img, w_img):
-                mask_uint8 = cv2.resize(mask_uint8, (w_img, h_img), interpolation=cv2.INTER_NEAREST)
+            mask_t = results[0].masks.data[0]
+
+            if tuple(mask_t.shape[-2:]) != (h_img, w_img):
+                mask_t = F.interpolate(
+                    mask_t[None, None].float(), size=(h_img, w_img), mode="nearest"
+                )[0, 0]
+
+            mask_uint8 = (mask_t > 0.5).to(torch.uint8).mul_(255).cpu().numpy()
 
             
             # 1. Filtrado de Componentes 
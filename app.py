@@ -22,6 +22,10 @@ def main():
     Inicializa los directorios del sistema, configura el estilo de la 
     aplicación y lanza la ventana principal.
     """
+    # Ajuste global de OpenCV antes de la primera operación de imagen
+    cv2.setUseOptimized(True)
+    if Config.OPENCV_THREADS is not None:
+        cv2.setNumThreads(Config.OPENCV_THREADS)
     
     folders = [
         Config.OUT_DIR, 
@@ -0,0 +1,89 @@
+"""
+Pruebas de DatabaseManager sobre una base SQLite temporal.
+Ejecutar: python tests/test_database_manager.py (o python -m pytest tests)
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BasedeDatos.DatabaseManager import DatabaseManager
+
+
+class UpdateMeasurementTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self._tmp.name, "test.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def test_edit_keeps_stored_image_path(self):
+        m_id = self.db.save_measurement({
+            'timestamp': '2026-03-01 10:00:00',
+            'fish_id': 'F1',
+            'length_cm': 12.0,
+            'confidence_score': 0.9,
+            'image_path': 'Resultados/F1.jpg',
+        })
+
+        # La edición reenvía el registro completo, con la ruta sin resolver
+        data = self.db.get_measurement_as_dict(m_id)
+        data.update({'length_cm': 13.5, 'image_path': '', 'confidence_score': 0.0})
+        self.assertTrue(self.db.update_measurement(m_id, data))
+
+        row = self.db.get_measurement_as_dict(m_id)
+        self.assertEqual(row['length_cm'], 13.5)
+        self.assertEqual(row['image_path'], 'Resultados/F1.jpg')
+        self.assertEqual(row['confidence_score'], 0.9)
+
+
+
+class TransactionTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self._tmp.name, "test.db"))
+        self.db._conn.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+        self.db._conn.execute(
+            "CREATE TABLE child (pid INTEGER REFERENCES parent(id) DEFERRABLE INITIALLY DEFERRED)"
+        )
+
+    def tearDown(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def test_failed_commit_rolls_back(self):
+        # La FK diferida solo se comprueba en el COMMIT, que falla
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.db._transaction() as cursor:
+                cursor.execute("INSERT INTO child (pid) VALUES (99)")
+
+        self.assertFalse(self.db._conn.in_transaction)
+        self.assertEqual(self.db._conn.execute("SELECT COUNT(*) FROM child").fetchone()[0], 0)
+        with self.db._transaction() as cursor:
+            cursor.execute("INSERT INTO parent (id) VALUES (1)")
+
+
+    def test_failed_bulk_commit_keeps_today_count(self):
+        today = date.today().isoformat()
+        self.db.get_next_fish_number()  # carga el conteo del día en memoria
+        self.db._conn.execute(
+            "CREATE TRIGGER fk_on_save AFTER INSERT ON measurements "
+            "BEGIN INSERT INTO child (pid) VALUES (99); END"
+        )
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.save_measurements_bulk([{'timestamp': f"{today} 10:00:00", 'fish_id': 'F1'}])
+
+        self.assertEqual(self.db.get_next_fish_number(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
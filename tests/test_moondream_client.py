@@ -0,0 +1,80 @@
+"""
+Comprueba que _PooledMoondreamClient envía la misma petición que
+CloudVL.detect de la versión de moondream verificada.
+Ejecutar: python tests/test_moondream_client.py (o python -m pytest tests)
+"""
+
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import moondream as md_lib
+    from moondream.types import Base64EncodedImage
+    from Modulos.AdvancedDetector import _PooledMoondreamClient
+except ImportError:
+    _PooledMoondreamClient = None
+
+_API_KEY = "test-key-0123456789"
+_IMAGE = "data:image/jpeg;base64,/9j/AAAA"
+_RESPONSE = b'{"objects": [{"x_min": 0.1, "y_min": 0.2, "x_max": 0.5, "y_max": 0.6}]}'
+
+
+@unittest.skipIf(_PooledMoondreamClient is None, "moondream o AdvancedDetector no disponibles")
+class PooledMoondreamClientTest(unittest.TestCase):
+
+    def _library_request(self, client):
+        """Petición que arma CloudVL.detect, capturada sin salir a la red."""
+        captured = {}
+
+        def fake_urlopen(req):
+            captured["req"] = req
+            return mock.MagicMock(**{"__enter__.return_value.read.return_value": _RESPONSE})
+
+        with mock.patch("urllib.request.urlopen", fake_urlopen):
+            result = client.detect(Base64EncodedImage(image_url=_IMAGE), "fish")
+        req = captured["req"]
+        headers = {k.lower(): v for k, v in req.header_items()}
+        return req.full_url, headers, json.loads(req.data), result
+
+    def _pooled_request(self, client):
+        """Petición que envía la sesión persistente, con `send` sustituido."""
+        pooled = _PooledMoondreamClient(client)
+        captured = {}
+
+        def fake_send(prepared, **kwargs):
+            captured["req"] = prepared
+            response = requests.Response()
+            response.status_code = 200
+            response._content = _RESPONSE
+            return response
+
+        with mock.patch.object(pooled._session, "send", fake_send):
+            result = pooled.detect(Base64EncodedImage(image_url=_IMAGE), "fish")
+        req = captured["req"]
+        headers = {k.lower(): v for k, v in req.headers.items()}
+        return req.url, headers, json.loads(req.body), result
+
+    def test_installed_version_is_supported(self):
+        self.assertTrue(_PooledMoondreamClient.supported())
+
+    def test_detect_matches_library_request(self):
+        client = md_lib.vl(api_key=_API_KEY)
+        lib_url, lib_headers, lib_payload, lib_result = self._library_request(client)
+        url, headers, payload, result = self._pooled_request(client)
+
+        self.assertEqual(url, lib_url)
+        self.assertEqual(payload, lib_payload)
+        for name, value in lib_headers.items():
+            self.assertEqual(headers.get(name), value, name)
+        self.assertEqual(result, lib_result)
+
+
+if __name__ == '__main__':
+    unittest.main()